@@ -0,0 +1,232 @@
+import numpy as np
+from os import listdir, getcwd
+from os.path import exists, join
+from figure import DownloadHelper, Figure
+
+
+class AirfoilIndex:
+    """
+    This class keeps geometric features of every airfoil
+    from the airfoil database, so airfoils can be found
+    without parsing coordinate files.
+    Index is built once from the airfoil directory and saved
+    to the npz file, next time it is only loaded.
+    Features are:
+    thickness - maximum thickness;
+    thickness_position - chord position of maximum thickness;
+    camber - maximum camber (with its sign);
+    camber_position - chord position of maximum camber;
+    le_radius - leading edge radius;
+    te_angle - trailing edge angle (radians);
+    points - number of coordinate points.
+    All lengths are divided by the chord.
+    Shape signature is thickness and camber at the
+    fixed chord stations, it is used to find nearest shapes.
+    """
+    features = ('thickness', 'thickness_position', 'camber',
+                'camber_position', 'le_radius', 'te_angle', 'points')
+    # number of stations for the shape signature
+    signature_size = 20
+    # number of stations to find maximum thickness and camber
+    dense_size = 401
+    # index file name inside the airfoil directory
+    index_file = 'airfoils_index.npz'
+
+    def __init__(self, names: np.array, values: np.array,
+                 signatures: np.array):
+        assert len(names) == len(values) == len(signatures)
+        self.names = np.asarray(names)
+        self.values = np.asarray(values, dtype=float)
+        self.signatures = np.asarray(signatures, dtype=float)
+        self.positions = {name: i for i, name in enumerate(self.names)}
+
+    def __len__(self):
+        return len(self.names)
+
+    @staticmethod
+    def stations(size: int) -> np.array:
+        """
+        Cosine spaced chord stations,
+        they are dense near leading and trailing edges.
+        """
+        return 0.5 * (1.0 - np.cos(np.linspace(0.0, np.pi, size)))
+
+    @staticmethod
+    def surfaces(x: np.array, y: np.array) -> tuple:
+        """
+        Splits closed contour by the leading edge point and
+        moves it to the unit chord along Ox axis.
+        Trailing edge is a middle of the contour ends,
+        leading edge is the farthest point from it.
+        Returns upper and lower surfaces with
+        increasing x coordinates.
+        """
+        x, y = np.asarray(x, dtype=float), np.asarray(y, dtype=float)
+        last = -2 if x[0] == x[-1] and y[0] == y[-1] else -1
+        x_te, y_te = 0.5 * (x[0] + x[last]), 0.5 * (y[0] + y[last])
+        le = np.argmax((x - x_te) ** 2 + (y - y_te) ** 2)
+        cx, cy = x_te - x[le], y_te - y[le]
+        chord = cx ** 2 + cy ** 2
+        assert chord > 0.0
+        dx, dy = x - x[le], y - y[le]
+        x, y = (dx * cx + dy * cy) / chord, (dy * cx - dx * cy) / chord
+        first = (x[:le + 1][::-1], y[:le + 1][::-1])
+        second = (x[le:], y[le:])
+        surfaces = list()
+        for xs, ys in (first, second):
+            order = np.argsort(xs, kind='stable')
+            surfaces.append((xs[order], ys[order]))
+        if surfaces[0][1].mean() < surfaces[1][1].mean():
+            surfaces.reverse()
+        return surfaces[0], surfaces[1]
+
+    @classmethod
+    def thickness_camber(cls, x: np.array, y: np.array,
+                         stations: np.array) -> tuple:
+        """
+        Returns thickness and camber at the given chord stations.
+        """
+        (xu, yu), (xl, yl) = cls.surfaces(x, y)
+        upper = np.interp(stations, xu, yu)
+        lower = np.interp(stations, xl, yl)
+        return upper - lower, 0.5 * (upper + lower)
+
+    @classmethod
+    def describe(cls, x: np.array, y: np.array) -> tuple:
+        """
+        Calculates features and shape signature
+        for the airfoil coordinates.
+        Leading edge radius is estimated from the half thickness
+        close to the nose, where it is sqrt(2 * r * x).
+        Trailing edge angle is measured between upper and lower
+        surfaces on the last 5 % of the chord.
+        """
+        dense = cls.stations(cls.dense_size)
+        thickness, camber = cls.thickness_camber(x, y, dense)
+        i_thickness = np.argmax(thickness)
+        i_camber = np.argmax(np.abs(camber))
+
+        (xu, yu), (xl, yl) = cls.surfaces(x, y)
+        x_nose, x_tail = 0.01, 0.95
+        half = 0.5 * (np.interp(x_nose, xu, yu) - np.interp(x_nose, xl, yl))
+        le_radius = half ** 2 / (2.0 * x_nose)
+        upper_slope = (np.interp(1.0, xu, yu) -
+                       np.interp(x_tail, xu, yu)) / (1.0 - x_tail)
+        lower_slope = (np.interp(1.0, xl, yl) -
+                       np.interp(x_tail, xl, yl)) / (1.0 - x_tail)
+        te_angle = np.arctan(lower_slope) - np.arctan(upper_slope)
+
+        values = (thickness[i_thickness], dense[i_thickness],
+                  camber[i_camber], dense[i_camber],
+                  le_radius, te_angle, len(x))
+        signature = np.concatenate(cls.thickness_camber(
+            x, y, cls.stations(cls.signature_size)))
+        return values, signature
+
+    @classmethod
+    def build(cls, path: str = '') -> 'AirfoilIndex':
+        """
+        Parses every airfoil file in the given directory.
+        Files which can't be parsed are skipped.
+        """
+        path = cls.data_path(path)
+        helper = DownloadHelper()
+        names, values, signatures = list(), list(), list()
+        for name in sorted(listdir(path)):
+            if name == cls.index_file:
+                continue
+            try:
+                x, y = helper.get_data(name, path)
+                if x is None or len(x) < 4:
+                    continue
+                value, signature = cls.describe(x, y)
+            except (IndexError, ValueError, AssertionError):
+                continue
+            names.append(name)
+            values.append(value)
+            signatures.append(signature)
+        return cls(np.array(names), np.array(values), np.array(signatures))
+
+    def save(self, file: str) -> None:
+        np.savez(file, names=self.names, values=self.values,
+                 signatures=self.signatures,
+                 features=np.array(self.features))
+
+    @classmethod
+    def load(cls, file: str) -> 'AirfoilIndex':
+        with np.load(file) as data:
+            assert tuple(data['features']) == cls.features
+            return cls(data['names'], data['values'], data['signatures'])
+
+    @staticmethod
+    def data_path(path: str = '') -> str:
+        return path or '{}/airfoils_data'.format(getcwd())
+
+    @classmethod
+    def open(cls, path: str = '', file: str = '') -> 'AirfoilIndex':
+        """
+        Loads index from the file, if file doesn't exist
+        index is built from the airfoil directory and saved.
+        By default the file is inside the airfoil directory,
+        so every directory has its own index.
+        """
+        if not file:
+            file = join(cls.data_path(path), cls.index_file)
+        if exists(file):
+            return cls.load(file)
+        index = cls.build(path)
+        index.save(file)
+        return index
+
+    def feature(self, name: str) -> np.array:
+        """
+        Returns values of the given feature for every airfoil.
+        """
+        return self.values[:, self.features.index(name)]
+
+    def query(self, **ranges) -> np.array:
+        """
+        Returns names of airfoils whose features
+        are inside the given ranges, for example:
+        query(thickness=(0.11, 0.13), camber_position=(0.25, 0.35))
+        """
+        found = np.ones(len(self), dtype=bool)
+        for name, (low, high) in ranges.items():
+            value = self.feature(name)
+            found &= (value >= low) & (value <= high)
+        return self.names[found]
+
+    def nearest_features(self, k: int = 5, **targets) -> np.array:
+        """
+        Returns names of k airfoils whose features are
+        the nearest to the given ones. Every feature is divided
+        by its standard deviation over the database.
+        """
+        columns = [self.features.index(name) for name in targets]
+        values = self.values[:, columns]
+        scale = values.std(axis=0)
+        scale[scale == 0.0] = 1.0
+        distance = np.linalg.norm((values - list(targets.values())) / scale,
+                                  axis=1)
+        return self.names[self.closest(distance, k)]
+
+    def nearest(self, shape, k: int = 5) -> np.array:
+        """
+        Returns names of k airfoils with the nearest shapes.
+        shape - airfoil name from the index, Figure
+        or shape signature.
+        """
+        if isinstance(shape, str):
+            signature = self.signatures[self.positions[shape]]
+        elif isinstance(shape, Figure):
+            signature = self.describe(shape.x, shape.y)[1]
+        else:
+            signature = np.asarray(shape, dtype=float)
+        distance = np.linalg.norm(self.signatures - signature, axis=1)
+        return self.names[self.closest(distance, k)]
+
+    @staticmethod
+    def closest(distance: np.array, k: int) -> np.array:
+        k = min(k, len(distance))
+        part = np.argpartition(distance, k - 1)[:k]
+        return part[np.argsort(distance[part])]
@@ -0,0 +1,165 @@
+import numpy as np
+import matplotlib.pyplot as plt
+from matplotlib import animation
+from matplotlib.cm import ScalarMappable
+from matplotlib.colors import Normalize
+from concurrent.futures import ThreadPoolExecutor
+from os import makedirs
+from os.path import join, splitext
+from flow import Flow
+from figure import Grid
+
+
+class ImageSequenceWriter(animation.AbstractMovieWriter):
+    """
+    Writes every frame to its own image in the directory,
+    it has the same interface as matplotlib movie writers.
+    """
+    def __init__(self, name: str = 'frame_{:05d}.png'):
+        super().__init__()
+        self.name = name
+        self.frame = 0
+
+    def setup(self, fig, outfile: str, dpi: float = None) -> None:
+        super().setup(fig, outfile, dpi)
+        makedirs(outfile, exist_ok=True)
+        self.frame = 0
+
+    def grab_frame(self, **savefig_kwargs) -> None:
+        self.fig.savefig(join(self.outfile, self.name.format(self.frame)),
+                         dpi=self.dpi, **savefig_kwargs)
+        self.frame += 1
+
+    def finish(self) -> None:
+        pass
+
+
+class FlowAnimation:
+    """
+    Animation of the flow sweep (alpha, gamma, body position).
+    Axes, bodies and colorbar are created once, every frame
+    only changes data of the layers:
+    raster - pressure coefficient image;
+    contour - filled pressure contours (recreated every frame);
+    quiver - velocity vectors;
+    stream - streamlines (recreated every frame).
+    grid - grid of all flows;
+    figures - bodies, they might be moved by the draw method;
+    cp_range - colorbar limits;
+    quiver_step - every quiver_step grid point has a vector.
+    """
+    layers = ('raster', 'contour', 'quiver', 'stream')
+
+    def __init__(self, grid: Grid, figures: list = (),
+                 layers: tuple = ('raster',), cp_range: tuple = (-3.0, 1.0),
+                 cmap: str = 'jet', quiver_step: int = 1,
+                 size: tuple = (8, 6), dpi: float = 100):
+        assert all(layer in self.layers for layer in layers)
+        self.grid = grid
+        self.layers = layers
+        self.quiver_step = quiver_step
+        self.dpi = dpi
+        self.figure, self.axes = plt.subplots(figsize=size)
+        self.axes.set_xlim(grid.xx.min(), grid.xx.max())
+        self.axes.set_ylim(grid.yy.min(), grid.yy.max())
+        self.axes.set_aspect('equal')
+        self.norm = Normalize(*cp_range)
+        self.cmap = cmap
+        self.title = self.axes.set_title('')
+
+        zeros = np.zeros(grid.xx.shape)
+        self.image = None
+        if 'raster' in layers:
+            self.image = self.axes.imshow(
+                zeros, origin='lower', cmap=cmap, norm=self.norm,
+                extent=(grid.x[0], grid.x[-1], grid.y[0], grid.y[-1]),
+                interpolation='bilinear')
+        self.quiver = None
+        if 'quiver' in layers:
+            step = (slice(None, None, quiver_step),) * 2
+            self.quiver = self.axes.quiver(grid.xx[step], grid.yy[step],
+                                           zeros[step], zeros[step],
+                                           color='k')
+        if 'raster' in layers or 'contour' in layers:
+            self.figure.colorbar(ScalarMappable(self.norm, cmap),
+                                 ax=self.axes, label='cp')
+        # artists which are recreated every frame
+        self.dynamic = list()
+        self.bodies = [self.axes.fill(f.x, f.y, color='0.8',
+                                      edgecolor='k', zorder=3)[0]
+                       for f in figures]
+
+    def draw(self, flow: Flow, title: str = None,
+             figures: list = None) -> None:
+        """
+        Changes data of every layer by the flow,
+        set_grid must be called for the flow before.
+        """
+        for artist in self.dynamic:
+            artist.remove()
+        self.dynamic = list()
+        if self.image is not None:
+            self.image.set_data(flow.cp)
+        if 'contour' in self.layers:
+            contour = self.axes.contourf(self.grid.xx, self.grid.yy, flow.cp,
+                                         100, cmap=self.cmap, norm=self.norm)
+            self.dynamic.append(contour)
+        if self.quiver is not None:
+            step = (slice(None, None, self.quiver_step),) * 2
+            self.quiver.set_UVC(flow.vx[step], flow.vy[step])
+        if 'stream' in self.layers:
+            patches = set(self.axes.patches)
+            stream = self.axes.streamplot(
+                self.grid.xx, self.grid.yy, flow.vx, flow.vy,
+                linewidth=0.5, density=2, color='w', arrowstyle='-',
+                start_points=self.grid.stream_line_start)
+            # arrows are added to the axes as separate patches
+            self.dynamic.append(stream.lines)
+            self.dynamic.extend(p for p in self.axes.patches
+                                if p not in patches)
+        if figures is not None:
+            for body, figure in zip(self.bodies, figures):
+                body.set_xy(np.column_stack((figure.x, figure.y)))
+        self.title.set_text(title if title is not None
+                            else '{} Flow'.format(flow.name))
+
+    @staticmethod
+    def writer(path: str, fps: int):
+        """
+        Movie writer by the file extension: mp4 or avi (ffmpeg),
+        gif (pillow), path without extension is a directory
+        of png images.
+        """
+        extension = splitext(path)[1].lower()
+        if extension in ('.mp4', '.avi', '.mkv'):
+            return animation.FFMpegWriter(fps=fps)
+        if extension == '.gif':
+            return animation.PillowWriter(fps=fps)
+        return ImageSequenceWriter()
+
+    def save(self, compute, parameters: list, path: str, fps: int = 10,
+             titles: list = None) -> None:
+        """
+        Draws a frame for every parameter and streams it to the path.
+        compute - function which returns the flow (with calculated
+        grid) for the parameter, it might return (flow, figures)
+        if bodies are moved. Flow of the next parameter is calculated
+        in the background thread while the frame is drawn and written.
+        """
+        parameters = list(parameters)
+        writer = self.writer(path, fps)
+        with ThreadPoolExecutor(1) as executor, \
+                writer.saving(self.figure, path, self.dpi):
+            future = executor.submit(compute, parameters[0]) \
+                if parameters else None
+            for i in range(len(parameters)):
+                result = future.result()
+                if i + 1 < len(parameters):
+                    future = executor.submit(compute, parameters[i + 1])
+                flow, figures = result if isinstance(result, tuple) \
+                    else (result, None)
+                self.draw(flow, titles[i] if titles else None, figures)
+                writer.grab_frame()
+
+    def close(self) -> None:
+        plt.close(self.figure)
@@ -1,5 +1,4 @@
 import numpy as np
-from scipy import interpolate
 from figure import Grid, Figure
 from flow import Flow
 
@@ -16,6 +15,7 @@ class Circulation:
         Calculate circulation for given Grid, Flow and Figure
         using the trapezoid method
         """
+        from scipy import interpolate
         # Interpolate X velocities from grid
         fx = interpolate.RectBivariateSpline(grid.y, grid.x, flow.vx)
         # Interpolate Y velocities from grid
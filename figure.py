@@ -1,10 +1,7 @@
 import re
 import numpy as np
-from bs4 import BeautifulSoup
-import urllib.request as urllib2
 from os.path import exists
 from os import getcwd
-from urllib.error import URLError
 
 
 class Grid:
@@ -19,6 +16,9 @@ class Grid:
                  width: float = 50.0, height: float = 50.0,
                  num_points: int = 0):
         assert width > 0.0 and height > 0.0 and num_points >= 0
+        self.x0, self.y0 = x0, y0
+        self.width, self.height = width, height
+        self.num_points = num_points
         self.x_num = int(max(width, 1) + 1) \
             if num_points == 0 else num_points
         self.y_num = int(max(height, 1) + 1) \
@@ -36,6 +36,14 @@ class Grid:
         self.stream_line_start = \
             np.vstack((x_stream_line, y_stream_line)).T
 
+    def spec(self) -> dict:
+        """
+        Parameters which create the same grid.
+        """
+        return {'x0': float(self.x0), 'y0': float(self.y0),
+                'width': float(self.width), 'height': float(self.height),
+                'num_points': int(self.num_points)}
+
 
 class DownloadHelper:
     """
@@ -45,25 +53,43 @@ class DownloadHelper:
     Next this class parses downloaded data
     and returns airfoil coordinates.
     Also it can get data from the given directory.
-    First initialization required a lot of time.
+    Internet connection is checked and the site page is
+    downloaded only when they are required for the first time,
+    urllib and BeautifulSoup are imported at the same moment,
+    so local data doesn't need them.
     """
     def __new__(cls, *args, **kwargs):
         if not hasattr(cls, 'instance'):
             cls.instance = super(DownloadHelper, cls).__new__(cls)
             cls.base_file_path = 'https://m-selig.ae.illinois.edu/ads/coord_seligFmt/'
-            cls.is_internet_on = cls.internet_on()
             cls.number = r'\s*([-+]?\d*\.\d*[eE]?[+-]?\d*)\s+([-+]?\d*\.\d*[eE]?[+-]?\d*)\s*'
-            if cls.is_internet_on:
-                cls.html_page = urllib2.urlopen(cls.base_file_path)
-                cls.soup = BeautifulSoup(cls.html_page, 'html.parser')
         return cls.instance
 
+    @property
+    def is_internet_on(self) -> bool:
+        cls = type(self)
+        if not hasattr(cls, 'internet'):
+            cls.internet = cls.internet_on()
+        return cls.internet
+
+    @property
+    def soup(self):
+        cls = type(self)
+        if not hasattr(cls, 'html_soup'):
+            import urllib.request as urllib2
+            from bs4 import BeautifulSoup
+            cls.html_page = urllib2.urlopen(cls.base_file_path)
+            cls.html_soup = BeautifulSoup(cls.html_page, 'html.parser')
+        return cls.html_soup
+
     @staticmethod
     def internet_on():
+        import urllib.request as urllib2
+        from urllib.error import URLError
         try:
             urllib2.urlopen('http://216.58.192.142', timeout=1)
             return True
-        except URLError:
+        except (URLError, OSError):
             return False
 
     def __download_data(self, name: str) -> str:
@@ -74,6 +100,7 @@ class DownloadHelper:
         data = self.soup.find('a', attrs=attrs)
         if not data:
             return ''
+        import urllib.request as urllib2
         read = urllib2.urlopen(self.base_file_path + data.get('href'))
         if not read:
             return ''
@@ -122,15 +149,10 @@ class DownloadHelper:
         xy = list()
         self.__parse_text(xy, text, name)
         self.__check_xy(xy, name)
-        coord_x, coord_y = np.empty(0), np.empty(0)
-        for x, y in xy:
-            coord_x = np.append(coord_x, x)
-            coord_y = np.append(coord_y, y)
-        if coord_x[0] != coord_x[-1] or \
-                coord_y[0] != coord_y[-1]:
-            coord_x = np.append(coord_x, coord_x[0])
-            coord_y = np.append(coord_y, coord_y[0])
-        return coord_x, coord_y
+        if tuple(xy[0]) != tuple(xy[-1]):
+            xy.append(xy[0])
+        coord = np.array(xy, dtype=float)
+        return coord[:, 0], coord[:, 1]
 
     def get_online_data(self, name: str) -> tuple:
         """
@@ -165,6 +187,7 @@ class DownloadHelper:
             path = getcwd()
         attrs = {'href': re.compile(regexp, re.IGNORECASE)}
         data = self.soup.find_all('a', attrs=attrs)
+        import urllib.request as urllib2
         for i, d in enumerate(data):
             name = re.sub('\\.dat', '', d.get('href'), flags=re.IGNORECASE)
             urllib2.urlretrieve(self.base_file_path + d.get('href'),
@@ -180,34 +203,190 @@ class Figure:
     x, y - coordinates
     x0, y0 - displacement coordinates
     num_points - number of split points
+    Figure is immutable: coordinates are stored in one
+    read-only (N, 2) array and everything which depends on
+    them is calculated once, transformations return new figures.
     """
+    __slots__ = ('name', 'x0', 'y0', 'num_points', 'points',
+                 'arclength', 'normals', 'bbox', 'center', 'centroid')
+
     def __init__(self, name: str, x: np.array, y: np.array,
                  x0: float = 0, y0: float = 0,
                  num_points: int = 100):
         assert len(x) == len(y)
+        points = np.empty((len(x), 2))
+        points[:, 0], points[:, 1] = x, y
+        self.setup(name, points, x0, y0, num_points)
+
+    def setup(self, name: str, points: np.array,
+              x0: float, y0: float, num_points: int,
+              derived: tuple = None) -> None:
+        """
+        Saves coordinates and everything what depends on them.
+        derived - result of the derived method,
+        it is calculated if it is not given.
+        """
+        points.flags.writeable = False
         self.name = name
-        self.x, self.y = x, y
+        self.points = points
         self.x0, self.y0 = x0, y0
         self.num_points = num_points
+        if derived is None:
+            derived = self.derived(points)
+        self.arclength, self.normals = derived[0], derived[1]
+        self.bbox, self.center, self.centroid = \
+            tuple(derived[2]), tuple(derived[3]), tuple(derived[4])
+
+    @staticmethod
+    def derived(points: np.array) -> tuple:
+        """
+        Calculates arclength, side normals, bounding box,
+        center and centroid for (N, 2) points or for
+        the (B, N, 2) stack of figures at once.
+        Normal is turned by 90 degrees counterclockwise
+        from the side direction.
+        Bounding box is (x min, y min, x max, y max).
+        Center is an average point, centroid is a center of
+        the area which is bounded by figure.
+        """
+        if points.shape[-2] == 0:
+            empty = np.zeros(points.shape[:-2] + (2,))
+            return np.empty(0), np.empty((0, 2)), \
+                np.zeros(points.shape[:-2] + (4,)), empty, empty
+        delta = points[..., 1:, :] - points[..., :-1, :]
+        ds = np.sqrt(np.einsum('...ij,...ij->...i', delta, delta))
+        arclength = np.zeros(points.shape[:-1])
+        np.cumsum(ds, axis=-1, out=arclength[..., 1:])
+        normals = delta[..., ::-1] / np.where(ds > 0.0, ds, 1.0)[..., None]
+        normals[..., 0] *= -1.0
+        bbox = np.concatenate((points.min(axis=-2),
+                               points.max(axis=-2)), axis=-1)
+        center = points.mean(axis=-2)
+        x, y = points[..., 0], points[..., 1]
+        cross = x[..., :-1] * y[..., 1:] - x[..., 1:] * y[..., :-1]
+        area = 3.0 * cross.sum(axis=-1)
+        safe_area = np.where(area != 0.0, area, 1.0)
+        centroid = np.stack(
+            (np.einsum('...i,...i->...', x[..., :-1] + x[..., 1:], cross),
+             np.einsum('...i,...i->...', y[..., :-1] + y[..., 1:], cross)),
+            axis=-1) / safe_area[..., None]
+        centroid = np.where((area != 0.0)[..., None], centroid, center)
+        arclength.flags.writeable = False
+        normals.flags.writeable = False
+        return arclength, normals, bbox, center, centroid
+
+    @classmethod
+    def batch(cls, name: str, points: np.array,
+              x0: np.array = 0.0, y0: np.array = 0.0,
+              num_points: int = 100) -> list:
+        """
+        Creates list of figures from the (B, N, 2) stack
+        of coordinates. Everything what depends on
+        coordinates is calculated for the whole stack at once,
+        figures keep views to the copy of the stack.
+        """
+        points = np.array(points, dtype=float)
+        assert points.ndim == 3 and points.shape[-1] == 2
+        amount = len(points)
+        arclength, normals, bbox, center, centroid = cls.derived(points)
+        points.flags.writeable = False
+        x0 = np.broadcast_to(x0, amount).tolist()
+        y0 = np.broadcast_to(y0, amount).tolist()
+        bbox, center, centroid = bbox.tolist(), center.tolist(), \
+            centroid.tolist()
+        figures = list()
+        for i in range(amount):
+            figure = cls.__new__(cls)
+            Figure.setup(figure, name, points[i], x0[i], y0[i], num_points,
+                         (arclength[i], normals[i], bbox[i],
+                          center[i], centroid[i]))
+            figures.append(figure)
+        return figures
+
+    @classmethod
+    def from_points(cls, name: str, points: np.array,
+                    x0: float = 0, y0: float = 0,
+                    num_points: int = 100) -> 'Figure':
+        """
+        Creates figure from the copy of (N, 2) array,
+        the given array stays writable.
+        """
+        figure = Figure.__new__(Figure)
+        figure.setup(name, np.array(points, dtype=float),
+                     x0, y0, num_points)
+        return figure
+
+    @property
+    def x(self) -> np.array:
+        return self.points[:, 0]
+
+    @property
+    def y(self) -> np.array:
+        return self.points[:, 1]
 
     def is_inside(self, x: float, y: float):
-        if x < min(self.x) or x > max(self.x) or \
-                y < min(self.y) or y > max(self.y):
+        x_min, y_min, x_max, y_max = self.bbox
+        if x < x_min or x > x_max or \
+                y < y_min or y > y_max:
             return False
-        count = 0
-        for (x1, y1), (x2, y2) in zip(self.coordinates, self.coordinates[1:]):
-            condition_x = (x2 > x1 and x1 <= x <= x2) or \
-                          (x1 > x2 and x2 <= x <= x1)
-            condition_y = y <= y1 or y <= y2
-            if not condition_x or not condition_y:
-                continue
-            k = (y2 - y1) / (x2 - x1) if x2 != x1 else 0.0
-            b = y1 - k * x1
-            y3 = k * x + b
-            if y3 >= y:
-                count += 1
+        x1, y1 = self.x[:-1], self.y[:-1]
+        x2, y2 = self.x[1:], self.y[1:]
+        condition_x = ((x2 > x1) & (x1 <= x) & (x <= x2)) | \
+                      ((x1 > x2) & (x2 <= x) & (x <= x1))
+        condition_y = (y <= y1) | (y <= y2)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            k = np.where(x2 != x1, (y2 - y1) / (x2 - x1), 0.0)
+        b = y1 - k * x1
+        y3 = k * x + b
+        count = np.count_nonzero(condition_x & condition_y & (y3 >= y))
         return count % 2 != 0
 
+    # maximum amount of point and side pairs which are checked at once
+    contains_chunk = 2 ** 20
+
+    @staticmethod
+    def flat_points(x: np.array, y: np.array) -> tuple:
+        """
+        Returns flat x, y arrays and their common shape.
+        """
+        x, y = np.broadcast_arrays(np.asarray(x, dtype=float),
+                                   np.asarray(y, dtype=float))
+        return x.ravel(), y.ravel(), x.shape
+
+    def contains(self, x: np.array, y: np.array) -> np.array:
+        """
+        The same as is_inside method, but for arrays of points.
+        Returns boolean array with the shape of points.
+        """
+        x, y, shape = self.flat_points(x, y)
+        result = np.zeros(x.size, dtype=bool)
+        x_min, y_min, x_max, y_max = self.bbox
+        index = np.flatnonzero((x >= x_min) & (x <= x_max) &
+                               (y >= y_min) & (y <= y_max))
+        x1, y1 = self.x[:-1], self.y[:-1]
+        x2, y2 = self.x[1:], self.y[1:]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            k = np.where(x2 != x1, (y2 - y1) / (x2 - x1), 0.0)
+        b = y1 - k * x1
+        chunk = max(self.contains_chunk // max(len(k), 1), 1)
+        for start in range(0, len(index), chunk):
+            i = index[start:start + chunk]
+            px, py = x[i, None], y[i, None]
+            condition_x = ((x2 > x1) & (x1 <= px) & (px <= x2)) | \
+                          ((x1 > x2) & (x2 <= px) & (px <= x1))
+            condition_y = (py <= y1) | (py <= y2)
+            count = np.count_nonzero(condition_x & condition_y &
+                                     (k * px + b >= py), axis=1)
+            result[i] = count % 2 != 0
+        return result.reshape(shape)
+
+    def mask_key(self) -> tuple:
+        """
+        Everything what contains method depends on
+        besides coordinates.
+        """
+        return (type(self).__name__,)
+
     @staticmethod
     def lin_space(start: float, stop: float,
                   num_points: int, endpoint: bool = True) -> np.array:
@@ -216,17 +395,11 @@ class Figure:
 
     @property
     def coordinates(self):
-        return np.array([(self.x[i], self.y[i])
-                         for i in range(self.length)])
+        return self.points
 
     @property
     def length(self):
-        return len(self.x)
-
-    @property
-    def center(self):
-        return sum(self.x) / self.length, \
-               sum(self.y) / self.length
+        return len(self.points)
 
     @property
     def rect(self) -> tuple:
@@ -237,18 +410,35 @@ class Figure:
         a - figure length (Ox axis)
         b - figure width (Oy axis)
         """
-        x0, y0 = min(self.x), min(self.y)
-        dx = abs(max(self.x) - x0)
-        dy = abs(max(self.y) - y0)
+        x0, y0, x1, y1 = self.bbox
+        dx, dy = abs(x1 - x0), abs(y1 - y0)
         return x0 + 0.5*dx, y0 + 0.5*dy, dx, dy
 
-    def rotate(self, angle: float) -> None:
-        x_cos = self.x * np.cos(angle)
-        x_sin = self.x * np.sin(angle)
-        y_cos = self.y * np.cos(angle)
-        y_sin = self.y * np.sin(angle)
-        self.x = x_cos - y_sin
-        self.y = x_sin + y_cos
+    def rotate(self, angle: float, xc: float = 0.0,
+               yc: float = 0.0) -> 'Figure':
+        """
+        Returns new figure rotated by angle around (xc, yc).
+        It is a plain Figure (see from_points), subclass
+        attributes are lost and contains uses the polygon test.
+        """
+        cos, sin = np.cos(angle), np.sin(angle)
+        points = self.points - (xc, yc)
+        rotated = np.empty_like(points)
+        rotated[:, 0] = points[:, 0] * cos - points[:, 1] * sin + xc
+        rotated[:, 1] = points[:, 0] * sin + points[:, 1] * cos + yc
+        x0 = (self.x0 - xc) * cos - (self.y0 - yc) * sin + xc
+        y0 = (self.x0 - xc) * sin + (self.y0 - yc) * cos + yc
+        return self.from_points(self.name, rotated, x0, y0,
+                                self.num_points)
+
+    def translate(self, dx: float, dy: float) -> 'Figure':
+        """
+        Returns new figure moved by (dx, dy).
+        It is a plain Figure as in the rotate method.
+        """
+        return self.from_points(self.name, self.points + (dx, dy),
+                                self.x0 + dx, self.y0 + dy,
+                                self.num_points)
 
 
 class Ellipse(Figure):
@@ -257,6 +447,8 @@ class Ellipse(Figure):
     a - semi-major axis
     b - semi-minor axis
     """
+    __slots__ = ('a', 'b')
+
     def __init__(self, a: float, b: float,
                  x0: float = 0, y0: float = 0,
                  num_points: int = 360):
@@ -269,16 +461,47 @@ class Ellipse(Figure):
         super().__init__('Ellipse', coord_x, coord_y,
                          x0, y0, num_points)
 
+    @classmethod
+    def batch_ellipses(cls, a: np.array, b: np.array,
+                       x0: np.array = 0.0, y0: np.array = 0.0,
+                       num_points: int = 360) -> list:
+        """
+        Creates ellipses for every given
+        combination of semi axes and displacements.
+        """
+        a, b, x0, y0 = np.broadcast_arrays(*(np.asarray(v, dtype=float)
+                                             for v in (a, b, x0, y0)))
+        assert np.all(a > 0) and np.all(b > 0)
+        a, b, x0, y0 = a.ravel(), b.ravel(), x0.ravel(), y0.ravel()
+        tetta = cls.lin_space(2 * np.pi, 0.0, num_points)
+        points = np.empty((len(a), len(tetta), 2))
+        points[..., 0] = a[:, None] * np.cos(tetta) + x0[:, None]
+        points[..., 1] = b[:, None] * np.sin(tetta) + y0[:, None]
+        figures = cls.batch('Ellipse', points, x0, y0, num_points)
+        for figure, ai, bi in zip(figures, a.tolist(), b.tolist()):
+            figure.a, figure.b = ai, bi
+        return figures
+
     def is_inside(self, x: float, y: float):
         return (x - self.x0) ** 2 / self.a ** 2 + \
                (y - self.y0) ** 2 / self.b ** 2 <= 1.0
 
+    def contains(self, x: np.array, y: np.array) -> np.array:
+        return self.is_inside(np.asarray(x, dtype=float),
+                              np.asarray(y, dtype=float))
+
+    def mask_key(self) -> tuple:
+        return (type(self).__name__, float(self.a), float(self.b),
+                float(self.x0), float(self.y0))
+
 
 class Circle(Ellipse):
     """
     Circle figure:
     a - radius
     """
+    __slots__ = ()
+
     def __init__(self, a: float,
                  x0: float = 0, y0: float = 0,
                  num_points: int = 360):
@@ -291,44 +514,59 @@ class Rectangle(Figure):
     a - length (Ox axis)
     b - width (Oy axis)
     """
+    __slots__ = ('a', 'b')
+
     def __init__(self, a: float, b: float,
                  x0: float = 0, y0: float = 0,
                  num_points: int = 400):
         assert a > 0 and b > 0
         self.a, self.b = a, b
         quarter_points = int(0.25 * num_points)
-        # X, Y coordinates of square
-        x1 = np.array([x0 + 0.5 * a] * (quarter_points + 1))
-        y1 = self.lin_space(y0 + 0.5 * b, y0 - 0.5 * b,
-                            quarter_points, False)
+        # X, Y coordinates of square, every side
+        # has quarter_points, the last side has the endpoint
+        side = quarter_points + 1
+        points = np.empty((4 * side, 2))
+        x, y = points[:, 0], points[:, 1]
 
-        x2 = self.lin_space(x0 + 0.5 * a, x0 - 0.5 * a,
-                            quarter_points, False)
-        y2 = np.array([y0 - 0.5 * b] * (quarter_points + 1))
+        x[:side] = x0 + 0.5 * a
+        y[:side] = self.lin_space(y0 + 0.5 * b, y0 - 0.5 * b,
+                                  quarter_points, False)
 
-        x3 = np.array([x0 - 0.5 * a] * (quarter_points + 1))
-        y3 = self.lin_space(y0 - 0.5 * b, y0 + 0.5 * b,
-                            quarter_points, False)
+        x[side:2*side] = self.lin_space(x0 + 0.5 * a, x0 - 0.5 * a,
+                                        quarter_points, False)
+        y[side:2*side] = y0 - 0.5 * b
 
-        x4 = self.lin_space(x0 - 0.5 * a, x0 + 0.5 * a,
-                            quarter_points)
-        y4 = np.array([y0 + 0.5 * b] * (quarter_points + 1))
+        x[2*side:3*side] = x0 - 0.5 * a
+        y[2*side:3*side] = self.lin_space(y0 - 0.5 * b, y0 + 0.5 * b,
+                                          quarter_points, False)
 
-        coord_x = np.concatenate([x1, x2, x3, x4])
-        coord_y = np.concatenate([y1, y2, y3, y4])
-        super().__init__('Square', coord_x, coord_y,
-                         x0, y0, num_points)
+        x[3*side:] = self.lin_space(x0 - 0.5 * a, x0 + 0.5 * a,
+                                    quarter_points)
+        y[3*side:] = y0 + 0.5 * b
+
+        self.setup('Square', points, x0, y0, num_points)
 
     def is_inside(self, x: float, y: float):
         return (self.x0 + 0.5 * self.a) >= x >= (self.x0 - 0.5 * self.a) and \
                (self.y0 + 0.5 * self.b) >= y >= (self.y0 - 0.5 * self.b)
 
+    def contains(self, x: np.array, y: np.array) -> np.array:
+        x, y = np.asarray(x, dtype=float), np.asarray(y, dtype=float)
+        return (np.abs(x - self.x0) <= 0.5 * self.a) & \
+               (np.abs(y - self.y0) <= 0.5 * self.b)
+
+    def mask_key(self) -> tuple:
+        return (type(self).__name__, float(self.a), float(self.b),
+                float(self.x0), float(self.y0))
+
 
 class Square(Rectangle):
     """
     Square figure:
     a - length (Ox and Oy axis)
     """
+    __slots__ = ()
+
     def __init__(self, a: float,
                  x0: float = 0, y0: float = 0,
                  num_points: int = 400):
@@ -341,6 +579,8 @@ class Polygon(Figure):
     points - coordinate points,
     each length might be 2.
     """
+    __slots__ = ()
+
     def make_side(self, p1: tuple, p2: tuple,
                   num_points: int, endpoint: bool = True) -> tuple:
         """
@@ -354,7 +594,7 @@ class Polygon(Figure):
 
         x = self.lin_space(p1[0], p2[0], num_points, endpoint) \
             if k != 0 or p1[1] == p2[1] \
-            else np.array([p1[0]] * (num_points + appendix))
+            else np.full(num_points + appendix, float(p1[0]))
         y = k * x + b if k != 0 \
             else self.lin_space(p1[1], p2[1],
                                 num_points, endpoint)
@@ -378,7 +618,7 @@ class Polygon(Figure):
         yc = sum(p[1] for p in points) / length
         points.sort(key=lambda c: self.atan(xc, yc, c[0], c[1]),
                     reverse=True)
-        coord_x, coord_y = np.empty(0), np.empty(0)
+        sides = list()
         endpoint = False
         for i in range(length):
             if i == (length - 1):
@@ -386,12 +626,16 @@ class Polygon(Figure):
                 endpoint = True
             else:
                 p1, p2 = points[i], points[i + 1]
-            x, y = self.make_side(p1, p2,
-                                  num_points, endpoint)
-            coord_x = np.append(coord_x, x)
-            coord_y = np.append(coord_y, y)
+            sides.append(self.make_side(p1, p2,
+                                        num_points, endpoint))
+        coord = np.empty((sum(len(x) for x, _ in sides), 2))
+        start = 0
+        for x, y in sides:
+            coord[start:start + len(x), 0] = x
+            coord[start:start + len(x), 1] = y
+            start += len(x)
 
-        super().__init__(name, coord_x, coord_y)
+        self.setup(name, coord, 0, 0, 100)
 
 
 class Triangle(Polygon):
@@ -400,6 +644,8 @@ class Triangle(Polygon):
     p1, p2, p3 - coordinate points,
     they might be a tuple with length equals 2
     """
+    __slots__ = ()
+
     def __init__(self, p1: tuple, p2: tuple, p3: tuple,
                  num_points: int = 15):
         assert len(p1) == len(p2) == len(p3) == 2
@@ -419,6 +665,8 @@ class Airfoil(Figure):
     For offline mode name should be writen fully,
     with extension.
     """
+    __slots__ = ()
+
     def __init__(self, name: str, path: str = '',
                  online: bool = False):
         helper = DownloadHelper()
@@ -430,6 +678,296 @@ class Airfoil(Figure):
         super().__init__(name, coord_x, coord_y)
 
 
+class NacaAirfoil(Figure):
+    """
+    NACA airfoil figure, which is calculated analytically:
+    designation - 4 or 5 digits, for example '2412', 'naca23012';
+    num_points - number of split points of every surface;
+    cosine - points are dense near leading and trailing edges;
+    closed_te - trailing edge thickness equals zero.
+    Coordinates go from trailing edge along lower surface
+    to the leading edge and back along upper surface,
+    chord equals 1.
+    Coordinates for many airfoils at once are calculated
+    by the stacked_coordinates and stacked_four_digit methods.
+    """
+    __slots__ = ('designation',)
+
+    # five digit mean line constants: position digit -> (m, k1)
+    standard_camber = {1: (0.0580, 361.400), 2: (0.1260, 51.640),
+                       3: (0.2025, 15.957), 4: (0.2900, 6.643),
+                       5: (0.3910, 3.230)}
+    # reflexed mean line constants: position digit -> (m, k1, k2 / k1)
+    reflex_camber = {2: (0.1300, 51.990, 0.000764),
+                     3: (0.2170, 15.793, 0.00677),
+                     4: (0.3180, 6.520, 0.0303),
+                     5: (0.4410, 3.191, 0.1355)}
+
+    def __init__(self, designation: str, num_points: int = 100,
+                 cosine: bool = True, closed_te: bool = False):
+        self.designation = self.digits(designation)
+        points = self.stacked_coordinates([designation], num_points,
+                                          cosine, closed_te)[0]
+        self.setup('NACA {}'.format(self.designation), points,
+                   0, 0, num_points)
+
+    @staticmethod
+    def digits(designation: str) -> str:
+        digits = re.sub(r'\D', '', str(designation))
+        assert len(digits) in (4, 5), \
+            'Wrong NACA designation: {}'.format(designation)
+        return digits
+
+    @staticmethod
+    def stations(num_points: int, cosine: bool = True) -> np.array:
+        """
+        Chord stations from leading to trailing edge.
+        """
+        assert num_points > 0
+        if cosine:
+            return 0.5 * (1.0 - np.cos(np.linspace(0.0, np.pi,
+                                                   num_points + 1)))
+        return np.linspace(0.0, 1.0, num_points + 1)
+
+    @staticmethod
+    def thickness(x: np.array, t: np.array,
+                  closed_te: bool = False) -> np.array:
+        """
+        Half thickness distribution of 4 and 5 digit airfoils.
+        """
+        a4 = -0.1036 if closed_te else -0.1015
+        return 5.0 * t * (0.2969 * np.sqrt(x) - 0.1260 * x -
+                          0.3516 * x ** 2 + 0.2843 * x ** 3 + a4 * x ** 4)
+
+    @staticmethod
+    def four_digit_camber(x: np.array, m: np.array, p: np.array) -> tuple:
+        """
+        Mean line and its slope of 4 digit airfoils.
+        """
+        front = x < p
+        p_front = np.where(p > 0.0, p, 1.0) ** 2
+        p_back = np.where(p < 1.0, 1.0 - p, 1.0) ** 2
+        yc = np.where(front, m / p_front * (2.0 * p * x - x ** 2),
+                      m / p_back * ((1.0 - 2.0 * p) + 2.0 * p * x - x ** 2))
+        dyc = np.where(front, 2.0 * m / p_front * (p - x),
+                       2.0 * m / p_back * (p - x))
+        return yc, dyc
+
+    @staticmethod
+    def five_digit_camber(x: np.array, m: np.array, k1: np.array,
+                          k21: np.array, scale: np.array) -> tuple:
+        """
+        Mean line and its slope of 5 digit airfoils,
+        k21 equals zero for standard mean line
+        and k2 / k1 for reflexed one.
+        scale is a ratio of design lift coefficient and 0.3.
+        """
+        front = x < m
+        reflex = k21 > 0.0
+        yc_front = np.where(
+            reflex,
+            (x - m) ** 3 - k21 * (1.0 - m) ** 3 * x - m ** 3 * x + m ** 3,
+            x ** 3 - 3.0 * m * x ** 2 + m ** 2 * (3.0 - m) * x)
+        dyc_front = np.where(
+            reflex,
+            3.0 * (x - m) ** 2 - k21 * (1.0 - m) ** 3 - m ** 3,
+            3.0 * x ** 2 - 6.0 * m * x + m ** 2 * (3.0 - m))
+        yc_back = np.where(
+            reflex,
+            k21 * (x - m) ** 3 - k21 * (1.0 - m) ** 3 * x -
+            m ** 3 * x + m ** 3,
+            m ** 3 * (1.0 - x))
+        dyc_back = np.where(
+            reflex,
+            3.0 * k21 * (x - m) ** 2 - k21 * (1.0 - m) ** 3 - m ** 3,
+            -m ** 3)
+        coef = scale * k1 / 6.0
+        return coef * np.where(front, yc_front, yc_back), \
+            coef * np.where(front, dyc_front, dyc_back)
+
+    @classmethod
+    def contour(cls, x: np.array, t: np.array, yc: np.array,
+                dyc: np.array, closed_te: bool) -> np.array:
+        """
+        Builds closed contours from the stations x (S,),
+        thickness t (B, 1), mean line yc and slope dyc (B, S).
+        Returns (B, P, 2) array.
+        """
+        yt = cls.thickness(x, t, closed_te)
+        theta = np.arctan(dyc)
+        sin, cos = yt * np.sin(theta), yt * np.cos(theta)
+        size = x.size
+        total = 2 * size - 1 if closed_te else 2 * size
+        points = np.empty((len(yt), total, 2))
+        # lower surface from trailing to leading edge
+        points[:, :size, 0] = (x + sin)[:, ::-1]
+        points[:, :size, 1] = (yc - cos)[:, ::-1]
+        # upper surface from leading to trailing edge
+        points[:, size:2 * size - 1, 0] = (x - sin)[:, 1:]
+        points[:, size:2 * size - 1, 1] = (yc + cos)[:, 1:]
+        if closed_te:
+            # both surfaces end exactly at the mean line
+            points[:, 0, 0] = x[-1]
+            points[:, 0, 1] = yc[:, -1]
+        points[:, -1] = points[:, 0]
+        return points
+
+    @classmethod
+    def stacked_four_digit(cls, m: np.array, p: np.array, t: np.array,
+                           num_points: int = 100, cosine: bool = True,
+                           closed_te: bool = False) -> np.array:
+        """
+        Coordinates of 4 digit airfoils for arrays of
+        maximum camber m, its position p and thickness t,
+        all values are divided by the chord.
+        Returns (B, P, 2) array.
+        """
+        m, p, t = (np.asarray(v, dtype=float).ravel()[:, None]
+                   for v in np.broadcast_arrays(m, p, t))
+        x = cls.stations(num_points, cosine)
+        yc, dyc = cls.four_digit_camber(x, m, p)
+        return cls.contour(x, t, yc, dyc, closed_te)
+
+    @classmethod
+    def stacked_coordinates(cls, designations: list, num_points: int = 100,
+                            cosine: bool = True,
+                            closed_te: bool = False) -> np.array:
+        """
+        Coordinates of 4 and 5 digit airfoils
+        for the list of designations.
+        Returns (B, P, 2) array.
+        """
+        digits = [cls.digits(d) for d in designations]
+        amount = len(digits)
+        five = np.array([len(d) == 5 for d in digits])
+        t = np.array([int(d[-2:]) / 100.0 for d in digits])[:, None]
+        m, p = np.zeros((amount, 1)), np.zeros((amount, 1))
+        k1, k21 = np.zeros((amount, 1)), np.zeros((amount, 1))
+        scale = np.zeros((amount, 1))
+        for i, d in enumerate(digits):
+            if not five[i]:
+                m[i], p[i] = int(d[0]) / 100.0, int(d[1]) / 10.0
+                continue
+            position, reflex = int(d[1]), int(d[2])
+            assert reflex in (0, 1), 'Wrong NACA designation: {}'.format(d)
+            if reflex:
+                m[i], k1[i], k21[i] = cls.reflex_camber[position]
+            else:
+                m[i], k1[i] = cls.standard_camber[position]
+            scale[i] = 0.15 * int(d[0]) / 0.3
+
+        x = cls.stations(num_points, cosine)
+        yc, dyc = cls.four_digit_camber(x, m, p)
+        if five.any():
+            yc5, dyc5 = cls.five_digit_camber(x, m, k1, k21, scale)
+            yc = np.where(five[:, None], yc5, yc)
+            dyc = np.where(five[:, None], dyc5, dyc)
+        return cls.contour(x, t, yc, dyc, closed_te)
+
+    @classmethod
+    def batch_airfoils(cls, designations: list, num_points: int = 100,
+                       cosine: bool = True,
+                       closed_te: bool = False) -> list:
+        """
+        Creates figures for the list of designations at once.
+        """
+        points = cls.stacked_coordinates(designations, num_points,
+                                         cosine, closed_te)
+        figures = cls.batch('NACA', points, num_points=num_points)
+        for figure, designation in zip(figures, designations):
+            figure.designation = cls.digits(designation)
+            figure.name = 'NACA {}'.format(figure.designation)
+        return figures
+
+
+class JoukowskiAirfoil(Figure):
+    """
+    Airfoil which is the image of the circle
+    by the Karman-Trefftz conformal mapping:
+    z = n b (1 + t) / (1 - t), t = ((zeta - b) / (zeta + b)) ^ n.
+    mu_x, mu_y - circle center in the zeta plane, negative mu_x
+    makes airfoil thicker, positive mu_y gives camber;
+    edge - b, circle passes through zeta = b, which is
+    mapped to the trailing edge z = n b;
+    exponent - n, it equals 2 for Joukowski airfoils (cusp
+    trailing edge), trailing edge angle is (2 - n) pi;
+    num_points - number of split points.
+    Coordinates go clockwise from the trailing edge,
+    angles keeps circle angle of every point.
+    """
+    __slots__ = ('mu', 'edge', 'radius', 'exponent', 'angles')
+
+    def __init__(self, mu_x: float = -0.1, mu_y: float = 0.1,
+                 edge: float = 1.0, exponent: float = 2.0,
+                 num_points: int = 200):
+        assert edge > 0 and 1.0 < exponent <= 2.0
+        self.mu = complex(mu_x, mu_y)
+        self.edge = edge
+        self.exponent = exponent
+        self.radius = abs(edge - self.mu)
+        # -b must be inside the circle, otherwise it isn't an airfoil
+        assert abs(-edge - self.mu) < self.radius
+        te_angle = np.angle(edge - self.mu)
+        self.angles = te_angle + self.lin_space(2 * np.pi, 0.0, num_points)
+        z = self.to_airfoil(self.circle_points())
+        super().__init__('Joukowski', z.real, z.imag, num_points=num_points)
+
+    def circle_points(self) -> np.array:
+        """
+        Points of the circle plane which are mapped to the
+        airfoil points, first and last ones are exactly b.
+        """
+        zeta = self.mu + self.radius * np.exp(1j * self.angles)
+        zeta[0] = zeta[-1] = self.edge
+        return zeta
+
+    def to_airfoil(self, zeta: np.array) -> np.array:
+        """
+        Maps points of the circle plane to the airfoil plane.
+        """
+        b, n = self.edge, self.exponent
+        with np.errstate(divide='ignore', invalid='ignore'):
+            t = ((zeta - b) / (zeta + b)) ** n
+            return n * b * (1 + t) / (1 - t)
+
+    def to_circle(self, z: np.array) -> np.array:
+        """
+        Maps points of the airfoil plane to the circle plane.
+        Inverse mapping has several branches, the one which
+        is the farthest from the circle center is chosen,
+        it is outside of the circle for points out of the airfoil.
+        """
+        b, n = self.edge, self.exponent
+        z = np.asarray(z, dtype=complex)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            t = (z - n * b) / (z + n * b)
+            phi, modulus = np.angle(t), np.abs(t) ** (1.0 / n)
+            zeta = np.full(z.shape, -b, dtype=complex)
+            distance = np.zeros(z.shape)
+            for k in (-1, 0, 1):
+                # only roots whose n-th power is the principal one
+                g = modulus * np.exp(1j * (phi + 2 * np.pi * k) / n)
+                root = b * (1 + g) / (1 - g)
+                root_distance = np.where(
+                    np.abs(phi + 2 * np.pi * k) <= n * np.pi,
+                    np.abs(root - self.mu), -np.inf)
+                better = root_distance > distance
+                zeta = np.where(better, root, zeta)
+                distance = np.where(better, root_distance, distance)
+        return zeta
+
+    def derivative(self, zeta: np.array) -> np.array:
+        """
+        dz / dzeta, it equals 0 at the trailing edge.
+        """
+        b, n = self.edge, self.exponent
+        with np.errstate(divide='ignore', invalid='ignore'):
+            g = (zeta - b) / (zeta + b)
+            t = g ** n
+            t_g = np.where(g != 0, t / np.where(g != 0, g, 1.0), 0.0)
+            return 4 * n ** 2 * b ** 2 * t_g / ((1 - t) * (zeta + b)) ** 2
+
+
 class Ogive(Figure):
     """
     Ogive figure:
@@ -437,6 +975,7 @@ class Ogive(Figure):
     nose_r - nose radius
     length - whole length
     """
+    __slots__ = ()
 
     @staticmethod
     def tangent(xc: float, yc: float, r: float, xt: float, yt: float):
@@ -479,7 +1018,7 @@ class Ogive(Figure):
         y3 = (y1[::-1])[:-1]
 
         x4 = self.lin_space(base_r, -base_r, num_points)
-        y4 = np.array([0] * (num_points + 1))
+        y4 = np.zeros(num_points + 1)
 
         coord_x = np.concatenate([x1, x2, x3, x4])
         coord_y = np.concatenate([y1, y2, y3, y4])
@@ -1,6 +1,108 @@
 import numpy as np
-from itertools import product
-from figure import Grid
+from collections import OrderedDict
+from hashlib import sha1
+from os import cpu_count, makedirs
+from os.path import exists, join
+from threading import Lock
+from concurrent.futures import ThreadPoolExecutor
+from figure import Grid, JoukowskiAirfoil
+
+
+class FieldCache:
+    """
+    Cache of calculated flow fields, key is a canonical
+    description of the flow and the grid (see Flow.cache_key).
+    Recently used fields are kept in memory while their size
+    is less than max_bytes, if path is given every field is also
+    saved to this directory and loaded from it after eviction.
+    Cached arrays are read-only, Flow.grid_velocity
+    returns their copies.
+    """
+    def __init__(self, max_bytes: int = 64 * 1024 ** 2, path: str = ''):
+        self.max_bytes = max_bytes
+        self.path = path
+        self.fields = OrderedDict()
+        self.bytes = 0
+        self.lock = Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self.fields)
+
+    @staticmethod
+    def file_name(key: tuple) -> str:
+        return sha1(repr(key).encode()).hexdigest() + '.npz'
+
+    def get(self, key: tuple):
+        with self.lock:
+            if key in self.fields:
+                self.hits += 1
+                self.fields.move_to_end(key)
+                return self.fields[key]
+        file = join(self.path, self.file_name(key)) if self.path else ''
+        if file and exists(file):
+            with np.load(file) as data:
+                field = data['vx'], data['vy']
+            self.put(key, *field, save=False)
+            with self.lock:
+                self.disk_hits += 1
+            return self.fields.get(key, field)
+        with self.lock:
+            self.misses += 1
+        return None
+
+    def put(self, key: tuple, vx: np.array, vy: np.array,
+            save: bool = True) -> None:
+        vx, vy = np.array(vx), np.array(vy)
+        vx.flags.writeable = vy.flags.writeable = False
+        if save and self.path:
+            makedirs(self.path, exist_ok=True)
+            np.savez(join(self.path, self.file_name(key)), vx=vx, vy=vy)
+        size = vx.nbytes + vy.nbytes
+        if size > self.max_bytes:
+            return
+        with self.lock:
+            if key in self.fields:
+                self.bytes -= sum(v.nbytes for v in self.fields.pop(key))
+            self.fields[key] = (vx, vy)
+            self.bytes += size
+            while self.bytes > self.max_bytes:
+                _, field = self.fields.popitem(last=False)
+                self.bytes -= sum(v.nbytes for v in field)
+
+    def clear(self) -> None:
+        with self.lock:
+            self.fields.clear()
+            self.bytes = 0
+
+    def stats(self) -> dict:
+        return {'fields': len(self), 'bytes': self.bytes,
+                'max_bytes': self.max_bytes, 'hits': self.hits,
+                'disk_hits': self.disk_hits, 'misses': self.misses}
+
+
+def canonical(value):
+    """
+    Hashable description of the flow parameter,
+    TypeError is raised if the value can't be described.
+    """
+    if isinstance(value, Flow):
+        key = value.cache_key()
+        if key is None:
+            raise TypeError('{} can not be cached'.format(value.name))
+        return key
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return value
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, (tuple, list)):
+        return tuple(canonical(v) for v in value)
+    if isinstance(value, np.ndarray):
+        return ('array', value.shape, value.dtype.str,
+                sha1(np.ascontiguousarray(value).tobytes()).hexdigest())
+    raise TypeError('{} can not be cached'.format(type(value).__name__))
 
 
 class Flow:
@@ -8,30 +110,134 @@ class Flow:
     This class creates pattern flow.
     You can combine pattern to create your own!
     x0, y0 is coordinates of origin.
+    If calc_velocity of your flow works with arrays of points,
+    set vectorized to True, otherwise it is called for every point.
+    Vectorized flows are calculated by blocks of rows,
+    blocks might be calculated by several threads,
+    amount of threads is set by workers (0 - all cores).
+    Vectorized flows which need a lot of memory per point
+    can limit amount of points by the chunk_size method.
+    Fields calculated by set_grid are kept in the shared
+    field_cache (64 MB by default), flow with the same
+    parameters on the same grid gets a writable copy of the
+    cached field. Set field_cache to None to switch it off.
     """
+    vectorized = False
+    workers = 1
+    field_cache = None
+    # attributes which don't describe the flow
+    cache_ignore = ('name', 'vx', 'vy', 'cp')
+    # default amount of points in one block
+    block_points = 2 ** 16
+
+    def chunk_size(self) -> int:
+        """
+        Maximum amount of points for one calc_velocity call,
+        0 means that block_points is used.
+        """
+        return 0
+
     def calc_velocity(self, x: float, y: float) -> tuple:
         """
         This method should be implemented by your own.
         """
         raise NotImplementedError
 
-    def velocity(self, xx: np.array, yy: np.array) -> tuple:
+    def calc_block(self, x: np.array, y: np.array, block: int) -> tuple:
+        """
+        Calculates velocities of one block of points.
+        Block number doesn't depend on the amount of workers,
+        so flows can use it to be deterministic (see RandomFlow).
+        """
+        return self.calc_velocity(x, y)
+
+    def block_rows(self, shape: tuple) -> tuple:
+        """
+        Returns length of one row and amount of rows in one block.
+        Rows are the last axis of points, every block contains
+        several rows, too long rows are split into single points.
+        """
+        points = self.chunk_size() or self.block_points
+        row = shape[-1] if len(shape) and shape[-1] <= points else 1
+        return row, max(points // row, 1)
+
+    def velocity(self, xx: np.array, yy: np.array,
+                 workers: int = None) -> tuple:
         """
-        Loop through the all points on the plot.
+        Calculates velocities at all points on the plot.
+        Results of every block are written directly
+        into the output arrays.
         """
-        xl, yl = len(xx[0]), len(xx)
-        vx = np.zeros([xl, yl])
-        vy = np.zeros([xl, yl])
-        for i, j in product(range(xl), range(yl)):
-            vx[i, j], vy[i, j] =\
-                self.calc_velocity(xx[i, j], yy[i, j])
+        xx, yy = np.asarray(xx, dtype=float), np.asarray(yy, dtype=float)
+        vx = np.zeros(xx.shape)
+        vy = np.zeros(xx.shape)
+        if not self.vectorized:
+            for i in np.ndindex(xx.shape):
+                vx[i], vy[i] = self.calc_velocity(xx[i], yy[i])
+            return vx, vy
+        if xx.size == 0:
+            return vx, vy
+        row, rows = self.block_rows(xx.shape)
+        x, y = xx.reshape(-1, row), yy.reshape(-1, row)
+        vx_rows, vy_rows = vx.reshape(-1, row), vy.reshape(-1, row)
+        starts = range(0, len(x), rows)
+
+        def calc(block: int) -> None:
+            part = slice(starts[block], starts[block] + rows)
+            block_vx, block_vy = self.calc_block(
+                x[part].ravel(), y[part].ravel(), block)
+            vx_rows[part].reshape(-1)[:] = block_vx
+            vy_rows[part].reshape(-1)[:] = block_vy
+
+        workers = self.workers if workers is None else workers
+        workers = min(workers or cpu_count() or 1, len(starts))
+        if workers > 1:
+            with ThreadPoolExecutor(workers) as executor:
+                list(executor.map(calc, range(len(starts))))
+        else:
+            for block in range(len(starts)):
+                calc(block)
         return vx, vy
 
-    def set_grid(self, grid: Grid):
+    def cache_key(self):
+        """
+        Canonical description of the flow: its class and
+        parameters, None if the flow can't be described.
+        """
+        try:
+            return (type(self).__name__,) + tuple(
+                (name, canonical(value))
+                for name, value in sorted(vars(self).items())
+                if name not in self.cache_ignore)
+        except TypeError:
+            return None
+
+    def grid_velocity(self, grid: Grid, workers: int = None,
+                      calc=None) -> tuple:
+        """
+        Returns velocities on the grid from the field cache,
+        if they are not cached they are calculated by calc
+        function (velocity method by default) and cached.
+        """
+        cache, key = self.field_cache, None
+        if cache is not None:
+            flow_key = self.cache_key()
+            if flow_key is not None:
+                key = (flow_key, tuple(sorted(grid.spec().items())))
+                field = cache.get(key)
+                if field is not None:
+                    return tuple(np.array(v) for v in field)
+        field = calc() if calc is not None \
+            else self.velocity(grid.xx, grid.yy, workers)
+        if key is not None:
+            cache.put(key, *field)
+        return field
+
+    def set_grid(self, grid: Grid, workers: int = None):
         """
         Calculates velocities at every point on the plot.
         """
-        self.vx, self.vy = self.velocity(grid.xx, grid.yy)
+        self.vx, self.vy = self.grid_velocity(grid, workers)
 
     def __init__(self, name: str,
                  x0: float = 0.0, y0: float = 0.0):
@@ -45,13 +251,29 @@ class RandomFlow(Flow):
     """
     Random velocity magnitude at every point on the plot.
     max_value is the absolute maximum velocity.
+    seed - seed of random generators, every block of the plot
+    has its own generator, so the result is the same
+    for any amount of workers.
     """
+    vectorized = True
+    cache_ignore = Flow.cache_ignore + ('generator',)
+
     def calc_velocity(self, x: float, y: float) -> tuple:
-        return np.random.uniform(-self.max_value, self.max_value),\
-               np.random.uniform(-self.max_value, self.max_value)
+        size = np.shape(x)
+        return self.generator.uniform(-self.max_value, self.max_value, size),\
+            self.generator.uniform(-self.max_value, self.max_value, size)
 
-    def __init__(self, max_value: float):
+    def calc_block(self, x: np.array, y: np.array, block: int) -> tuple:
+        generator = np.random.default_rng([self.seed, block])
+        size = np.shape(x)
+        return generator.uniform(-self.max_value, self.max_value, size),\
+            generator.uniform(-self.max_value, self.max_value, size)
+
+    def __init__(self, max_value: float, seed: int = None):
         self.max_value = max_value
+        self.seed = np.random.SeedSequence().entropy \
+            if seed is None else seed
+        self.generator = np.random.default_rng(self.seed)
         super().__init__('Random')
 
 
@@ -61,6 +283,8 @@ class UniformFlow(Flow):
     vel is the magnitude of the velocity.
     alpha is the angel between velocity and horizontal axis.
     """
+    vectorized = True
+
     def calc_velocity(self, x: float, y: float) -> tuple:
         return self.vel * np.cos(self.alpha),\
                self.vel * np.sin(self.alpha)
@@ -77,10 +301,13 @@ class SourceFlow(Flow):
     lam is the strength, if it is positive the flow is called
     source, if it is negative the flow is called sink.
     """
+    vectorized = True
+
     def calc_velocity(self, x: float, y: float) -> tuple:
         dx, dy = x - self.x0, y - self.y0
         r2 = dx ** 2 + dy ** 2
-        lam_pi_r2 = (self.lam_pi / r2) if r2 > 0.0 else 0.0
+        lam_pi_r2 = np.where(r2 > 0.0,
+                             self.lam_pi / np.where(r2 > 0.0, r2, 1.0), 0.0)
         vx, vy = lam_pi_r2 * dx, lam_pi_r2 * dy
         return vx, vy
 
@@ -94,6 +321,8 @@ class SemiInfiniteFlow(Flow):
     """
     This flow is combined from Uniform and Source (Sink) flows.
     """
+    vectorized = True
+
     def calc_velocity(self, x: float, y: float) -> tuple:
         u_vx, u_vy = self.uniform.calc_velocity(x, y)
         s_vx, s_vy = self.source.calc_velocity(x, y)
@@ -115,6 +344,8 @@ class OvalShapedFlow(Flow):
     Source and Sink flows.
     dist is a distance between source and sink.
     """
+    vectorized = True
+
     def calc_velocity(self, x: float, y: float) -> tuple:
         u_vx, u_vy = self.uniform.calc_velocity(x, y)
         s_vx, s_vy = self.source.calc_velocity(x, y)
@@ -138,16 +369,16 @@ class DoubletFlow(Flow):
     are united in one point.
     kappa is the strength of such flow.
     """
+    vectorized = True
+
     def calc_velocity(self, x: float, y: float) -> tuple:
         dx, dy = x - self.x0, y - self.y0
         r2 = dx ** 2 + dy ** 2
-        if r2 > 0.0:
-            r4 = r2 ** 2
-            vx = (self.kappa_pi / r4) * (dy ** 2 - dx ** 2)
-            vy = -(self.kappa_pi / r4) * dx * dy
-            return vx, vy
-        else:
-            return 0.0, 0.0
+        kappa_pi_r4 = np.where(r2 > 0.0, self.kappa_pi /
+                               np.where(r2 > 0.0, r2, 1.0) ** 2, 0.0)
+        vx = kappa_pi_r4 * (dy ** 2 - dx ** 2)
+        vy = -kappa_pi_r4 * dx * dy
+        return vx, vy
 
     def __init__(self, kappa: float,
                  x0: float = 0.0, y0: float = 0.0):
@@ -161,6 +392,8 @@ class NonLiftingCylinderFlow(Flow):
     This flow is combined from Uniform flow
     and Doublet flow.
     """
+    vectorized = True
+
     def calc_velocity(self, x: float, y: float) -> tuple:
         u_vx, u_vy = self.uniform.calc_velocity(x, y)
         d_vx, d_vy = self.doublet.calc_velocity(x, y)
@@ -184,10 +417,14 @@ class VortexFlow(Flow):
     tangential to the circles.
     gamma is a circulation.
     """
+    vectorized = True
+
     def calc_velocity(self, x: float, y: float) -> tuple:
         dx, dy = x - self.x0, y - self.y0
         r2 = dx ** 2 + dy ** 2
-        gamma_pi_r2 = (self.gamma_pi / r2) if r2 > 0.0 else 0.0
+        gamma_pi_r2 = np.where(r2 > 0.0,
+                               self.gamma_pi / np.where(r2 > 0.0, r2, 1.0),
+                               0.0)
         vx, vy = gamma_pi_r2 * dy, -gamma_pi_r2 * dx
         return vx, vy
 
@@ -202,6 +439,8 @@ class LiftingCylinderFlow(Flow):
     This flow is combined from Non Lifting Cylinder flow
     and Vortex flow.
     """
+    vectorized = True
+
     def calc_velocity(self, x: float, y: float) -> tuple:
         nl_vx, nl_vy = self.non_lift.calc_velocity(x, y)
         v_vx, v_vy = self.vortex.calc_velocity(x, y)
@@ -214,3 +453,113 @@ class LiftingCylinderFlow(Flow):
         self.vortex = VortexFlow(gamma, x0, y0)
         super().__init__('Lift Cylinder R = {:.02f}'
                          .format(self.non_lift.rad), x0, y0)
+
+
+class JoukowskiFlow(Flow):
+    """
+    Exact flow over the Joukowski (Karman-Trefftz) airfoil.
+    It is the lifting cylinder flow in the circle plane
+    which is mapped to the airfoil plane, so every point
+    costs O(1) without any panel matrix.
+    Circulation is chosen by the Kutta condition,
+    velocity is finite at the trailing edge.
+    Gamma sign is the same as in VortexFlow
+    (positive gamma gives positive lift).
+    Velocity inside the airfoil equals 0.
+    """
+    vectorized = True
+    cache_ignore = Flow.cache_ignore + ('airfoil',)
+
+    def __init__(self, airfoil: JoukowskiAirfoil, vel: float,
+                 alpha: float = 0.0):
+        assert vel > 0
+        self.airfoil = airfoil
+        self.vel = vel
+        self.alpha = alpha
+        self.mu = (airfoil.mu.real, airfoil.mu.imag)
+        self.edge = airfoil.edge
+        self.exponent = airfoil.exponent
+        te_angle = np.angle(airfoil.edge - airfoil.mu)
+        self.gamma = 4 * np.pi * airfoil.radius * vel * \
+            np.sin(alpha - te_angle)
+        x_min, _, x_max, _ = airfoil.bbox
+        self.chord = x_max - x_min
+        super().__init__('Joukowski G = {:.02f}'.format(self.gamma))
+
+    @property
+    def cl(self) -> float:
+        """
+        Lift coefficient by the Kutta-Joukowski theorem.
+        """
+        return 2.0 * self.gamma / (self.vel * self.chord)
+
+    def circle_velocity(self, zeta: np.array) -> np.array:
+        """
+        Complex velocity u - iv of the lifting cylinder
+        flow in the circle plane.
+        """
+        r = zeta - self.airfoil.mu
+        a2 = self.airfoil.radius ** 2
+        return self.vel * (np.exp(-1j * self.alpha) -
+                           a2 * np.exp(1j * self.alpha) / r ** 2) + \
+            1j * self.gamma / (2 * np.pi * r)
+
+    def complex_velocity(self, zeta: np.array) -> np.array:
+        """
+        Complex velocity in the airfoil plane
+        at the images of the given circle plane points.
+        Both velocity and dz / dzeta equal 0 at the trailing
+        edge, it is a stagnation point if the edge angle isn't 0,
+        for the cusp the limit is w' / z'' (z'' = 2 / b).
+        """
+        derivative = self.airfoil.derivative(zeta)
+        tail = derivative == 0
+        with np.errstate(divide='ignore', invalid='ignore'):
+            w = self.circle_velocity(zeta) / derivative
+        if not tail.any():
+            return w
+        if self.exponent < 2.0:
+            return np.where(tail, 0.0, w)
+        r = self.airfoil.edge - self.airfoil.mu
+        limit = (2 * self.vel * self.airfoil.radius ** 2 *
+                 np.exp(1j * self.alpha) / r ** 3 -
+                 1j * self.gamma / (2 * np.pi * r ** 2)) * \
+            self.airfoil.edge / 2.0
+        return np.where(tail, limit, w)
+
+    def calc_velocity(self, x: float, y: float) -> tuple:
+        x, y = np.asarray(x, dtype=float), np.asarray(y, dtype=float)
+        zeta = self.airfoil.to_circle(x + 1j * y)
+        inside = np.abs(zeta - self.airfoil.mu) < self.airfoil.radius
+        # any point out of the circle, its velocity isn't used
+        outside = self.airfoil.mu + 2.0 * self.airfoil.radius
+        w = self.complex_velocity(np.where(inside, outside, zeta))
+        return np.where(inside, 0.0, w.real), np.where(inside, 0.0, -w.imag)
+
+    def surface_velocity(self) -> np.array:
+        """
+        Tangential velocity at every airfoil point,
+        it is positive in the direction of coordinates
+        (along Ox axis at the trailing edge).
+        """
+        zeta = self.airfoil.circle_points()
+        w = self.complex_velocity(zeta)
+        # direction of the contour in the airfoil plane
+        direction = -1j * zeta + 1j * self.airfoil.mu
+        direction = direction * self.airfoil.derivative(zeta)
+        direction = np.where(direction == 0, 1.0, direction)
+        return np.real(w * direction / np.abs(direction))
+
+    def surface_cp(self) -> np.array:
+        return 1.0 - (self.surface_velocity() / self.vel) ** 2
+
+    def set_grid(self, grid: Grid, workers: int = None):
+        """
+        Calculates velocities and pressure coefficient
+        at every point on the plot.
+        """
+        self.vx, self.vy = self.grid_velocity(grid, workers)
+        self.cp = 1.0 - (self.vx ** 2 + self.vy ** 2) / self.vel ** 2
+
+
+Flow.field_cache = FieldCache()
@@ -0,0 +1,144 @@
+import numpy as np
+from figure import Figure, Grid
+
+
+class Scene:
+    """
+    Scene contains a lot of figures and helps to find
+    which figure contains given points or which figures
+    intersect given tile.
+    Bounding box hierarchy is built over the figures,
+    so every point is checked only with figures whose
+    bounding boxes contain it.
+    figures - list of figures;
+    leaf_size - maximum amount of figures in one leaf.
+    """
+    def __init__(self, figures: list, leaf_size: int = 4):
+        assert len(figures) > 0 and leaf_size > 0
+        self.figures = list(figures)
+        self.leaf_size = leaf_size
+        # x min, y min, x max, y max of every figure
+        self.boxes = np.array([f.bbox for f in self.figures], dtype=float)
+        # figure indexes, every leaf owns a part of this array
+        self.order = np.arange(len(self.figures))
+        # bounding box of every node
+        self.node_boxes = list()
+        # left and right children of every node, -1 for leaf
+        self.children = list()
+        # start and stop indexes of the order array for every node
+        self.ranges = list()
+        self.build(0, len(self.figures))
+        self.node_boxes = np.array(self.node_boxes)
+        self.children = np.array(self.children)
+        self.ranges = np.array(self.ranges)
+
+    def build(self, start: int, stop: int) -> int:
+        """
+        Builds the node for the figures from start to stop
+        of the order array and returns its index.
+        Figures are split by median center along
+        the axis with the biggest spread.
+        """
+        node = len(self.node_boxes)
+        boxes = self.boxes[self.order[start:stop]]
+        self.node_boxes.append((*boxes[:, :2].min(axis=0),
+                                *boxes[:, 2:].max(axis=0)))
+        self.children.append((-1, -1))
+        self.ranges.append((start, stop))
+        if stop - start <= self.leaf_size:
+            return node
+        centers = 0.5 * (boxes[:, :2] + boxes[:, 2:])
+        axis = np.argmax(np.ptp(centers, axis=0))
+        middle = (stop - start) // 2
+        part = np.argpartition(centers[:, axis], middle)
+        self.order[start:stop] = self.order[start:stop][part]
+        left = self.build(start, start + middle)
+        right = self.build(start + middle, stop)
+        self.children[node] = (left, right)
+        return node
+
+    def is_leaf(self, node: int) -> bool:
+        return self.children[node][0] < 0
+
+    def leaf_figures(self, node: int) -> np.array:
+        start, stop = self.ranges[node]
+        return self.order[start:stop]
+
+    def locate(self, x: np.array, y: np.array) -> np.array:
+        """
+        Returns index of the figure which contains every point,
+        -1 if point is outside of all figures.
+        If figures overlap, the smallest index is returned.
+        """
+        x, y, shape = Figure.flat_points(x, y)
+        result = np.full(x.size, -1)
+        stack = [(0, np.arange(x.size))]
+        while stack:
+            node, index = stack.pop()
+            x_min, y_min, x_max, y_max = self.node_boxes[node]
+            px, py = x[index], y[index]
+            index = index[(px >= x_min) & (px <= x_max) &
+                          (py >= y_min) & (py <= y_max)]
+            if index.size == 0:
+                continue
+            if not self.is_leaf(node):
+                stack.extend((child, index) for child in self.children[node])
+                continue
+            for i in self.leaf_figures(node):
+                found = index[self.figures[i].contains(x[index], y[index])]
+                previous = result[found]
+                result[found] = np.where((previous < 0) | (previous > i),
+                                         i, previous)
+        return result.reshape(shape)
+
+    def mask(self, grid: Grid) -> np.array:
+        """
+        Returns True for every grid point which is inside any figure.
+        """
+        return self.locate(grid.xx, grid.yy) >= 0
+
+    def intersecting(self, x_min: np.array, y_min: np.array,
+                     x_max: np.array, y_max: np.array) -> list:
+        """
+        Returns indexes of figures whose bounding boxes
+        intersect every given tile. Tiles might be arrays,
+        in this case list of index arrays is returned,
+        one array for every tile.
+        """
+        tiles = np.broadcast_arrays(*(np.asarray(v, dtype=float)
+                                      for v in (x_min, y_min, x_max, y_max)))
+        is_scalar = tiles[0].ndim == 0
+        tiles = [t.ravel() for t in tiles]
+        found_tiles, found_figures = list(), list()
+        stack = [(0, np.arange(tiles[0].size))]
+        while stack:
+            node, index = stack.pop()
+            index = index[self.overlap(self.node_boxes[node], tiles, index)]
+            if index.size == 0:
+                continue
+            if not self.is_leaf(node):
+                stack.extend((child, index) for child in self.children[node])
+                continue
+            for i in self.leaf_figures(node):
+                hit = index[self.overlap(self.boxes[i], tiles, index)]
+                found_tiles.append(hit)
+                found_figures.append(np.full(hit.size, i))
+        found_tiles = np.concatenate(found_tiles) \
+            if found_tiles else np.empty(0, dtype=int)
+        found_figures = np.concatenate(found_figures) \
+            if found_figures else np.empty(0, dtype=int)
+        order = np.lexsort((found_figures, found_tiles))
+        found_tiles, found_figures = found_tiles[order], found_figures[order]
+        bounds = np.searchsorted(found_tiles, np.arange(tiles[0].size + 1))
+        result = [found_figures[bounds[i]:bounds[i + 1]]
+                  for i in range(tiles[0].size)]
+        return result[0] if is_scalar else result
+
+    @staticmethod
+    def overlap(box: np.array, tiles: list, index: np.array) -> np.array:
+        """
+        Returns True for every tile which overlaps the box.
+        """
+        x_min, y_min, x_max, y_max = (t[index] for t in tiles)
+        return (x_min <= box[2]) & (x_max >= box[0]) & \
+               (y_min <= box[3]) & (y_max >= box[1])
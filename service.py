@@ -0,0 +1,239 @@
+import json
+import numpy as np
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from os import getcwd
+from threading import Event, Lock, Thread
+from time import sleep
+from figure import Airfoil, NacaAirfoil
+from source_panel_method import SourcePanelMethod
+
+
+class LRUCache:
+    """
+    Thread safe dictionary which keeps only
+    capacity recently used values.
+    """
+    def __init__(self, capacity: int):
+        assert capacity > 0
+        self.capacity = capacity
+        self.values = OrderedDict()
+        self.lock = Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self.values)
+
+    def get(self, key, count: bool = True):
+        with self.lock:
+            if key not in self.values:
+                self.misses += count
+                return None
+            self.hits += count
+            self.values.move_to_end(key)
+            return self.values[key]
+
+    def put(self, key, value) -> None:
+        with self.lock:
+            self.values[key] = value
+            self.values.move_to_end(key)
+            while len(self.values) > self.capacity:
+                self.values.popitem(last=False)
+
+    def stats(self) -> dict:
+        return {'size': len(self), 'capacity': self.capacity,
+                'hits': self.hits, 'misses': self.misses}
+
+
+class SolveBatch:
+    """
+    Alphas of one airfoil which are solved together.
+    """
+    def __init__(self):
+        self.alphas = list()
+        self.results = list()
+        self.error = None
+        self.done = Event()
+
+
+class PanelService:
+    """
+    Keeps airfoils, factorized influence matrices and
+    solutions in memory, so repeated questions about the same
+    airfoils are answered without parsing and solving.
+    Airfoil is a NACA designation ('naca2412', '23012')
+    or a file name from the airfoil directory (path).
+    panels - amount of points of every NACA surface;
+    max_airfoils - amount of factorized airfoils in memory;
+    max_solutions - amount of (airfoil, alpha, velocity) solutions;
+    batch_window - time (seconds) for which the first request
+    waits for other alphas of the same airfoil,
+    all of them are solved by one back substitution.
+    Alpha is in radians as everywhere else.
+    """
+    def __init__(self, path: str = '', panels: int = 100,
+                 max_airfoils: int = 16, max_solutions: int = 1024,
+                 batch_window: float = 0.002):
+        self.path = path if path else '{}/airfoils_data'.format(getcwd())
+        self.panels = panels
+        self.airfoils = LRUCache(max_airfoils)
+        self.solutions = LRUCache(max_solutions)
+        self.batch_window = batch_window
+        self.lock = Lock()
+        # airfoil name -> lock, so one airfoil is factorized once
+        self.airfoil_locks = dict()
+        # (airfoil, velocity) -> batch which is waiting for solve
+        self.pending = dict()
+        self.batches = 0
+
+    def figure(self, name: str):
+        digits = name.lower().replace('naca', '', 1)
+        if digits.isdigit() and len(digits) in (4, 5):
+            return NacaAirfoil(digits, self.panels)
+        return Airfoil(name, self.path)
+
+    def airfoil(self, name: str) -> SourcePanelMethod:
+        """
+        Returns factorized solver of the airfoil.
+        """
+        spm = self.airfoils.get(name)
+        if spm is not None:
+            return spm
+        with self.lock:
+            lock = self.airfoil_locks.setdefault(name, Lock())
+        with lock:
+            spm = self.airfoils.get(name, count=False)
+            if spm is None:
+                spm = SourcePanelMethod(self.figure(name), 1.0,
+                                        solver='dense', solve=False)
+                spm.factorize()
+                self.airfoils.put(name, spm)
+        return spm
+
+    def solve(self, name: str, alpha: float,
+              velocity: float = 1.0) -> SourcePanelMethod:
+        """
+        Returns solution of the airfoil, concurrent requests
+        of the same airfoil are solved together.
+        """
+        key = (name, float(alpha), float(velocity))
+        spm = self.solutions.get(key)
+        if spm is not None:
+            return spm
+        with self.lock:
+            batch = self.pending.get(key[::2])
+            is_leader = batch is None
+            if is_leader:
+                batch = self.pending[key[::2]] = SolveBatch()
+            if key[1] not in batch.alphas:
+                batch.alphas.append(key[1])
+            index = batch.alphas.index(key[1])
+        if is_leader:
+            self.solve_batch(name, velocity, batch)
+        batch.done.wait()
+        if batch.error is not None:
+            raise batch.error
+        return batch.results[index]
+
+    def solve_batch(self, name: str, velocity: float,
+                    batch: SolveBatch) -> None:
+        sleep(self.batch_window)
+        with self.lock:
+            self.pending.pop((name, float(velocity)))
+            self.batches += 1
+        try:
+            spm = self.airfoil(name)
+            solutions = spm.solve_alphas(batch.alphas, velocity)
+            for i, alpha in enumerate(batch.alphas):
+                solution = spm.solved(alpha, velocity,
+                                      *(s[:, i] for s in solutions))
+                self.solutions.put((name, alpha, float(velocity)), solution)
+                batch.results.append(solution)
+        except Exception as error:
+            batch.error = error
+        batch.done.set()
+
+    def surface_cp(self, name: str, alpha: float,
+                   velocity: float = 1.0) -> dict:
+        spm = self.solve(name, alpha, velocity)
+        return {'airfoil': name, 'alpha': alpha, 'velocity': velocity,
+                'x': spm.geometry.xc.tolist(), 'y': spm.geometry.yc.tolist(),
+                'cp': spm.surface_cp.tolist()}
+
+    def velocity(self, name: str, alpha: float, x: list, y: list,
+                 velocity: float = 1.0) -> dict:
+        spm = self.solve(name, alpha, velocity)
+        vx, vy = spm.velocity(np.asarray(x, dtype=float),
+                              np.asarray(y, dtype=float), workers=1)
+        return {'airfoil': name, 'alpha': alpha, 'velocity': velocity,
+                'vx': vx.tolist(), 'vy': vy.tolist()}
+
+    def stats(self) -> dict:
+        return {'airfoils': self.airfoils.stats(),
+                'solutions': self.solutions.stats(),
+                'batches': self.batches}
+
+    def serve(self, host: str = '127.0.0.1',
+              port: int = 8765) -> ThreadingHTTPServer:
+        """
+        Creates HTTP server, call serve_forever to start it
+        (port 0 chooses any free port, see server_address).
+        Requests:
+        POST /cp {"airfoil": "naca2412", "alpha": 0.1}
+        POST /velocity {"airfoil": "naca2412", "alpha": 0.1,
+                        "x": [1.5], "y": [0.2]}
+        GET /stats
+        velocity (free stream) might be added to POST requests.
+        """
+        server = ThreadingHTTPServer((host, port), PanelRequestHandler)
+        server.daemon_threads = True
+        server.service = self
+        return server
+
+    def start(self, host: str = '127.0.0.1', port: int = 0) -> tuple:
+        """
+        Starts the server in the background thread,
+        returns the server and its url.
+        """
+        server = self.serve(host, port)
+        Thread(target=server.serve_forever, daemon=True).start()
+        host, port = server.server_address[:2]
+        return server, 'http://{}:{}'.format(host, port)
+
+
+class PanelRequestHandler(BaseHTTPRequestHandler):
+    """
+    JSON requests of the PanelService.
+    """
+    def do_GET(self):
+        if self.path == '/stats':
+            self.reply(200, self.server.service.stats())
+        else:
+            self.reply(404, {'error': 'unknown path {}'.format(self.path)})
+
+    def do_POST(self):
+        service = self.server.service
+        methods = {'/cp': service.surface_cp, '/velocity': service.velocity}
+        if self.path not in methods:
+            self.reply(404, {'error': 'unknown path {}'.format(self.path)})
+            return
+        try:
+            size = int(self.headers.get('Content-Length', 0))
+            request = json.loads(self.rfile.read(size))
+            self.reply(200, methods[self.path](
+                request.pop('airfoil'), **request))
+        except (KeyError, TypeError, ValueError, AssertionError,
+                OSError) as error:
+            self.reply(400, {'error': repr(error)})
+
+    def reply(self, code: int, data: dict) -> None:
+        body = json.dumps(data).encode()
+        self.send_response(code)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
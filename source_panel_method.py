@@ -1,24 +1,80 @@
+import json
+from hashlib import sha1
+from os import makedirs, cpu_count
+from os.path import exists, join
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from multiprocessing.shared_memory import SharedMemory
 from flow import Flow
 from figure import Figure, Grid
 import numpy as np
 
 
+# scipy is imported on the first factorization or gmres solve,
+# so the module is loaded fast by workers which don't need them
+def lu_factor(*args, **kwargs):
+    from scipy.linalg import lu_factor
+    return lu_factor(*args, **kwargs)
+
+
+def lu_solve(*args, **kwargs):
+    from scipy.linalg import lu_solve
+    return lu_solve(*args, **kwargs)
+
+
+def linear_operator(*args, **kwargs):
+    from scipy.sparse.linalg import LinearOperator
+    return LinearOperator(*args, **kwargs)
+
+
+def gmres(*args, **kwargs):
+    from scipy.sparse.linalg import gmres
+    return gmres(*args, **kwargs)
+
+
+def cubic_spline(*args, **kwargs):
+    from scipy.interpolate import CubicSpline
+    return CubicSpline(*args, **kwargs)
+
+
 class Geometry:
     def __init__(self, figure: Figure, alpha: float = 0.0):
+        self.setup(figure.x, figure.y, alpha)
+
+    @classmethod
+    def from_coordinates(cls, x: np.array, y: np.array,
+                         alpha: float = 0.0) -> 'Geometry':
+        """
+        Creates geometry from contour coordinates,
+        they might be complex (see SourcePanelMethod.partials).
+        """
+        geometry = cls.__new__(cls)
+        geometry.setup(x, y, alpha)
+        return geometry
+
+    def setup(self, x: np.array, y: np.array, alpha: float) -> None:
+        # points are the last axis, (B, N + 1) stacks of
+        # contours give stacked geometry (see BatchPanelMethod)
         # amount of panels
-        self.length = figure.length - 1
+        self.length = x.shape[-1] - 1
         # start coordinates
-        self.xi = figure.x[:-1]
-        self.yi = figure.y[:-1]
+        self.xi = x[..., :-1]
+        self.yi = y[..., :-1]
         # control point coordinates
-        self.xc = 0.5 * (figure.x[0:-1] + figure.x[1:])
-        self.yc = 0.5 * (figure.y[0:-1] + figure.y[1:])
+        self.xc = 0.5 * (x[..., 0:-1] + x[..., 1:])
+        self.yc = 0.5 * (y[..., 0:-1] + y[..., 1:])
         # length of each panel
-        self.dx = figure.x[1:] - figure.x[0:-1]
-        self.dy = figure.y[1:] - figure.y[0:-1]
+        self.dx = x[..., 1:] - x[..., 0:-1]
+        self.dy = y[..., 1:] - y[..., 0:-1]
         self.s = (self.dx ** 2 + self.dy ** 2) ** 0.5
         # main angle of each panel
         self.fi = self.arc_tan_2(self.dy, self.dx)
+        self.set_directions(alpha)
+
+    def set_directions(self, alpha: float) -> None:
+        """
+        Calculates normal angles and sin, cos
+        of panel angles fi at control points.
+        """
         # angle between normal vector and panel
         self.betta = self.fi + 0.5 * np.pi
         # angle between normal vector and free stream velocity
@@ -34,12 +90,69 @@ class Geometry:
 
     @staticmethod
     def arc_tan_2(y: np.array, x: np.array) -> np.array:
-        fi = np.arctan2(y, x)
-        for i, f in enumerate(fi):
-            if f < 0.0:
-                fi[i] += 2.0 * np.pi
+        fi = np.arctan2(np.real(y), np.real(x))
+        fi = np.where(fi < 0.0, fi + 2.0 * np.pi, fi)
+        if np.iscomplexobj(x) or np.iscomplexobj(y):
+            # imaginary part is the complex step derivative
+            x, y = np.asarray(x, dtype=complex), np.asarray(y, dtype=complex)
+            fi = fi + 1j * (x.real * y.imag - y.real * x.imag) / \
+                (x.real ** 2 + y.real ** 2)
         return fi
 
+    def integral_terms(self, x: np.array, y: np.array) -> tuple:
+        """
+        Calculates parts of the panel integrals which
+        depend only on the point position, so they can be
+        shared between several velocity directions.
+        x, y - points of any shape, panels are added
+        as the last axis of every returned array.
+        """
+        xi, yi = self.xi[..., None, :], self.yi[..., None, :]
+        s = self.s[..., None, :]
+        dx = x[..., None] - xi
+        dy = y[..., None] - yi
+        a = - dx * self.cos_fi[..., None, :] - dy * self.sin_fi[..., None, :]
+        b = dx ** 2 + dy ** 2
+        e_sqrt = b - a ** 2
+        # comparisons use real parts, so complex coordinates work too
+        e = np.sqrt(np.where(e_sqrt.real > 0.0, e_sqrt, 1.0))
+        with np.errstate(divide='ignore', invalid='ignore'):
+            log_term = np.where(b.real > 0.0,
+                                np.log((s ** 2 + 2 * a * s + b) /
+                                       np.where(b.real > 0.0, b, 1.0)),
+                                0.0)
+            atan_term = np.where(e_sqrt.real > 0.0,
+                                 (np.arctan((s + a) / e) -
+                                  np.arctan(a / e)) / e,
+                                 0.0)
+        return dx, dy, a, log_term, atan_term
+
+    def integral(self, terms: tuple, ux: np.array, uy: np.array) -> np.array:
+        """
+        Integral of the panel influence on the velocity
+        component directed along (ux, uy) unit vector.
+        terms - result of the integral_terms method,
+        ux, uy - have the same shape as the points.
+        """
+        dx, dy, a, log_term, atan_term = terms
+        ux, uy = np.asarray(ux)[..., None], np.asarray(uy)[..., None]
+        c = - ux * self.cos_fi[..., None, :] - uy * self.sin_fi[..., None, :]
+        d = dx * ux + dy * uy
+        return 0.5 * c * log_term + (d - a * c) * atan_term
+
+    def subset(self, index) -> 'Geometry':
+        """
+        Returns geometry which contains only given panels.
+        index - slice or array of panel indexes.
+        """
+        geometry = type(self).__new__(type(self))
+        for key, value in vars(self).items():
+            if isinstance(value, np.ndarray):
+                value = value[..., index]
+            setattr(geometry, key, value)
+        geometry.length = geometry.xi.shape[-1]
+        return geometry
+
 
 class CircleGeometry(Geometry):
     def __init__(self, figure: Figure, alpha: float = 0.0):
@@ -48,123 +161,797 @@ class CircleGeometry(Geometry):
         self.angle_cp = self.arc_tan_2(self.yc, self.xc)
 
 
+class CurvedGeometry(Geometry):
+    """
+    Panels are arcs of the cubic spline through figure points,
+    spline parameter is the chord length, spline is periodic
+    if the contour is closed. Control points are middles of the
+    arcs, fi is the angle of the arc tangent there,
+    s is the arc length, dx and dy are chords.
+    Every panel keeps its gauss points (gx, gy), their weights
+    multiplied by the arc length element (gw) and arc distances
+    from the control point (sigma), gauss points are the first
+    axis. Strength of the panel is the parabola through control
+    strengths of the panel and its neighbours, d_ and q_ arrays
+    are weights of previous, own and next strengths in its
+    first and second derivatives.
+    """
+    gauss_points = 8
+
+    def setup(self, x: np.array, y: np.array, alpha: float) -> None:
+        super().setup(x, y, alpha)
+        chord = self.s
+        points = np.column_stack((x, y))
+        # contour is closed if its ends are closer than round off
+        self.closed = bool(np.hypot(*(points[-1] - points[0])) <=
+                           1e-12 * chord.sum())
+        if self.closed:
+            points[-1] = points[0]
+        knots = np.concatenate(([0.0], np.cumsum(chord)))
+        spline = cubic_spline(knots, points,
+                              bc_type='periodic' if self.closed
+                              else 'not-a-knot')
+        nodes, weights = np.polynomial.legendre.leggauss(self.gauss_points)
+        u = knots[:-1] + 0.5 * (nodes[:, None] + 1.0) * chord
+        points, derivative = spline(u), spline(u, 1)
+        self.gx, self.gy = points[..., 0], points[..., 1]
+        self.gw = 0.5 * weights[:, None] * chord * \
+            np.hypot(derivative[..., 0], derivative[..., 1])
+        self.s = self.gw.sum(axis=0)
+        self.sigma = 0.5 * nodes[:, None] * self.s
+        middle = knots[:-1] + 0.5 * chord
+        self.xc, self.yc = spline(middle).T
+        tangent = spline(middle, 1)
+        self.fi = self.arc_tan_2(tangent[:, 1], tangent[:, 0])
+        self.set_directions(alpha)
+
+        # distances to control points of previous and next panels
+        before = 0.5 * (self.s + np.roll(self.s, 1))
+        after = 0.5 * (self.s + np.roll(self.s, -1))
+        total = before + after
+        self.d_previous = - after / (before * total)
+        self.d_own = (after - before) / (before * after)
+        self.d_next = before / (after * total)
+        self.q_previous = 2.0 / (before * total)
+        self.q_own = - 2.0 / (before * after)
+        self.q_next = 2.0 / (after * total)
+        if not self.closed:
+            # end panels of the open contour have constant strength
+            for weights in (self.d_previous, self.d_own, self.d_next,
+                            self.q_previous, self.q_own, self.q_next):
+                weights[[0, -1]] = 0.0
+
+    def subset(self, index) -> 'CurvedGeometry':
+        """
+        Neighbours of the subset ends are not in the subset,
+        so it is closed only if it contains all panels.
+        """
+        geometry = super().subset(index)
+        geometry.closed = self.closed and geometry.length == self.length
+        return geometry
+
+
+class FarField:
+    """
+    Multipole expansion of the source panels, it replaces
+    exact panel integrals at points which are far from the panels.
+    Panels are split into clusters of consecutive panels,
+    every cluster has its own expansion:
+    u - iv = sum(M_k / (z - zc) ^ (k + 1)) / (2 pi),
+    M_k = sum(lambda_j * integral((ze - zc) ^ k ds)).
+    Error of the truncated expansion at distance d is not bigger
+    than Q / (2 pi) * (R / d) ^ order / (d - R), where R is the radius
+    of the cluster and Q = sum(|lambda_j| * s_j), expansion is used
+    only if this bound is less than the tolerance.
+    """
+    def __init__(self, geometry: Geometry, lambdas: np.array,
+                 order: int = 16, cluster_size: int = 32):
+        self.geometry = geometry
+        self.lambdas = lambdas
+        self.order = order
+        self.clusters = [slice(start, min(start + cluster_size,
+                                          geometry.length))
+                         for start in range(0, geometry.length, cluster_size)]
+        # gauss points integrate polynomials of the order exactly
+        nodes, weights = np.polynomial.legendre.leggauss(
+            max((order + 1) // 2, 1))
+        start = geometry.xi + 1j * geometry.yi
+        end = start + geometry.dx + 1j * geometry.dy
+        self.centers, self.radii, self.charges, self.moments = \
+            list(), list(), list(), list()
+        for panels in self.clusters:
+            center = np.mean(start[panels] + end[panels]) / 2.0
+            radius = max(np.abs(start[panels] - center).max(),
+                         np.abs(end[panels] - center).max())
+            points = 0.5 * (start[panels, None] + end[panels, None]) + \
+                0.5 * (end[panels, None] - start[panels, None]) * nodes
+            strength = lambdas[panels, None] * \
+                0.5 * geometry.s[panels, None] * weights
+            powers = np.cumprod(np.concatenate(
+                (np.ones(points.shape + (1,)),
+                 np.repeat((points - center)[..., None], order - 1, axis=-1)),
+                axis=-1), axis=-1)
+            self.centers.append(center)
+            self.radii.append(radius)
+            self.charges.append(np.abs(lambdas[panels] *
+                                       geometry.s[panels]).sum())
+            self.moments.append(np.einsum('pg,pgk->k', strength, powers))
+
+    def bound(self, cluster: int, distance: np.array) -> np.array:
+        """
+        Error bound of the expansion at the given distances
+        from the cluster center.
+        """
+        radius = self.radii[cluster]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            bound = self.charges[cluster] / (2.0 * np.pi) * \
+                (radius / distance) ** self.order / (distance - radius)
+        return np.where(distance > radius, bound, np.inf)
+
+    def velocity(self, x: np.array, y: np.array,
+                 tolerance: float) -> tuple:
+        """
+        Returns sums of panel influences on x and y velocity
+        components, the same as mx @ lambdas and my @ lambdas.
+        Exact integrals are used for clusters which are too close.
+        """
+        z = x + 1j * y
+        w = np.zeros(z.shape, dtype=complex)
+        x_summary, y_summary = np.zeros(z.shape), np.zeros(z.shape)
+        for i, panels in enumerate(self.clusters):
+            dz = z - self.centers[i]
+            far = self.bound(i, np.abs(dz)) <= tolerance
+            inverse = 1.0 / dz[far]
+            term = inverse.copy()
+            for moment in self.moments[i]:
+                w[far] += moment * term
+                term *= inverse
+            near = ~far
+            if near.any():
+                mx, my = SourcePanelMethod.field_influence(
+                    self.geometry.subset(panels), x[near], y[near])
+                x_summary[near] += mx @ self.lambdas[panels]
+                y_summary[near] += my @ self.lambdas[panels]
+        return x_summary + w.real, y_summary - w.imag
+
+
+class Symmetry:
+    """
+    Mirror symmetry of the figure panels.
+    axis - 0 if the figure is symmetric about the horizontal
+    line y = center, 1 for the vertical line x = center;
+    pairs - index of the mirror panel for every panel,
+    panel might be the mirror of itself.
+    Mirror panels go in the opposite directions,
+    so pairs is (shift - index) mod N.
+    """
+    def __init__(self, axis: int, center: float, pairs: np.array):
+        self.axis = axis
+        self.center = center
+        self.pairs = pairs
+        # one panel of every pair
+        self.half = np.flatnonzero(np.arange(len(pairs)) <= pairs)
+        # panels which are the mirrors of themselves
+        self.single = self.pairs[self.half] == self.half
+
+    def split(self, alpha: float) -> tuple:
+        """
+        Splits free stream direction into the symmetric part
+        (along the axis) and antisymmetric one.
+        """
+        if self.axis == 0:
+            return (np.cos(alpha), 0.0), (0.0, np.sin(alpha))
+        return (0.0, np.sin(alpha)), (np.cos(alpha), 0.0)
+
+    @classmethod
+    def detect(cls, geometry: Geometry,
+               tolerance: float = 1e-9) -> 'Symmetry':
+        """
+        Returns symmetry of the geometry or None if it isn't
+        symmetric. Horizontal axis is checked first, axes go
+        through the middle of the bounding box, control points
+        of mirror panels must be closer than tolerance
+        multiplied by the figure size.
+        """
+        length = geometry.length
+        x, y = geometry.xi, geometry.yi
+        scale = max(np.ptp(x), np.ptp(y))
+        if length < 2 or scale == 0.0:
+            return None
+        for axis, coordinate in enumerate((y, x)):
+            center = 0.5 * (coordinate.min() + coordinate.max())
+            mx, my = (geometry.xc, 2.0 * center - geometry.yc) if axis == 0 \
+                else (2.0 * center - geometry.xc, geometry.yc)
+            shift = np.argmin((geometry.xc - mx[0]) ** 2 +
+                              (geometry.yc - my[0]) ** 2)
+            pairs = (shift - np.arange(length)) % length
+            error = max(np.abs(geometry.xc[pairs] - mx).max(),
+                        np.abs(geometry.yc[pairs] - my).max())
+            if error <= tolerance * scale:
+                return cls(axis, center, pairs)
+        return None
+
+
+class Rotation:
+    """
+    Rotational uniformity of the figure panels: every panel is
+    the previous one rotated by the same angle around the center,
+    so influence of the panel j on the control point of the panel i
+    depends only on (j - i) mod N and influence matrices are
+    circulant. Circle with uniformly spaced points is such a figure.
+    """
+    def __init__(self, center: tuple, angle: float):
+        self.center = center
+        self.angle = angle
+
+    @staticmethod
+    def column(row: np.array) -> np.array:
+        """
+        Spectrum of the circulant matrix with the given first row,
+        its first column is the row in the reversed cyclic order.
+        """
+        return np.fft.rfft(np.roll(row[::-1], 1))
+
+    @staticmethod
+    def product(spectrum: np.array, values: np.array) -> np.array:
+        return np.fft.irfft(spectrum * np.fft.rfft(values), len(values))
+
+    @staticmethod
+    def solve(spectrum: np.array, rhs: np.array) -> np.array:
+        return np.fft.irfft(np.fft.rfft(rhs) / spectrum, len(rhs))
+
+    @classmethod
+    def detect(cls, geometry: Geometry,
+               tolerance: float = 1e-9) -> 'Rotation':
+        """
+        Returns rotation of the geometry or None if panels are not
+        rotationally uniform: panel lengths, turning angles between
+        neighbour panels and distances from the start points
+        to the center must be the same up to the tolerance
+        (relative to the panel length for lengths and distances).
+        """
+        length = geometry.length
+        if length < 3 or geometry.s.max() == 0.0:
+            return None
+        s = geometry.s
+        turn = np.angle(np.exp(1j * (np.roll(geometry.fi, -1) -
+                                     geometry.fi)))
+        center = (geometry.xi.mean(), geometry.yi.mean())
+        radius = np.hypot(geometry.xi - center[0], geometry.yi - center[1])
+        if np.ptp(s) > tolerance * s.max() or \
+                np.ptp(turn) > tolerance or \
+                np.ptp(radius) > tolerance * s.max():
+            return None
+        return cls(center, turn.mean())
+
+
 class SourcePanelMethod(Flow):
+    """
+    Source panel method for the flow over the given figure.
+    low_memory - doesn't keep influence matrices in memory,
+    only one factorized matrix is stored, tangential velocities
+    are calculated row block by row block;
+    single_precision - factorizes influence matrix in float32
+    (only for low_memory mode) and refines solution
+    to the float64 accuracy;
+    block_size - amount of rows in one block,
+    it is chosen automatically if it equals 0;
+    verbose - prints expected memory before allocation
+    and the amount of iterations;
+    solver - 'dense', 'gmres' or 'auto', auto mode chooses
+    gmres if memory of the direct solve (see memory_estimate)
+    is bigger than dense_memory_limit, direct solve is faster
+    while matrices fit into memory;
+    tol - relative residual tolerance for gmres;
+    max_iter - maximum amount of gmres iterations;
+    preconditioner_size - amount of neighbour panels in one
+    block of the block diagonal preconditioner;
+    solve - if False lambdas are not calculated,
+    it is used to load saved solutions;
+    symmetric - mirror symmetry of the figure is detected
+    (see Symmetry) and the dense solver assembles only half
+    of the rows and solves symmetric and antisymmetric half
+    systems, figure which isn't symmetric is solved as usual,
+    auto solver counts memory of the half systems;
+    circulant - rotational uniformity of the figure is detected
+    (see Rotation) and the system is solved by FFT in N log N
+    operations, only the first rows of influence matrices
+    are calculated, other figures are solved as usual.
+    Solution and flow field can be saved to the directory
+    and loaded back without solving (see save and load methods).
+    If far_field_tolerance is bigger than 0, velocities at points
+    far from the figure are calculated by the multipole expansion
+    with this absolute error bound (see FarField).
+    """
+    # memory which is allowed for temporary arrays of one block
+    block_memory = 64 * 1024 ** 2
+    # amount of temporary arrays created for one block
+    block_arrays = 12
+    # maximum number of iterative refinement steps
+    max_refinement = 20
+    # memory of the direct solve since which gmres is used in auto mode
+    dense_memory_limit = 2 * 1024 ** 3
+    # maximum rank of the low rank update divided by amount of panels,
+    # matrix is factorized again if the rank is bigger
+    max_update_rank = 0.1
+    # absolute velocity error of the far field, 0 - exact integrals
+    far_field_tolerance = 0.0
+    # amount of multipole terms and panels in one cluster
+    far_field_order = 16
+    far_field_cluster = 32
+    solvers = ('auto', 'dense', 'gmres')
+
     def __init__(self, figure: Figure, velocity: float, alpha: float = 0.0,
-                 geometry: Geometry = None):
+                 geometry: Geometry = None, low_memory: bool = False,
+                 single_precision: bool = False, block_size: int = 0,
+                 verbose: bool = False, solver: str = 'auto',
+                 tol: float = 1e-12, max_iter: int = 500,
+                 preconditioner_size: int = 64, solve: bool = True,
+                 symmetric: bool = False, circulant: bool = False):
+        assert not single_precision or low_memory
+        assert solver in self.solvers and tol > 0.0
         self.figure = figure
         self.v_inf = velocity
         self.alpha = alpha
         self.geometry = geometry if geometry else Geometry(figure, alpha)
+        self.low_memory = low_memory
+        self.single_precision = single_precision
+        self.block_size = block_size if block_size > 0 \
+            else self.auto_block_size(self.geometry.length)
+        self.verbose = verbose
+        self.symmetry = Symmetry.detect(self.geometry) if symmetric else None
+        self.solver = self.choose_solver(solver, self.geometry.length,
+                                         low_memory, single_precision,
+                                         self.block_size,
+                                         self.symmetry is not None)
+        self.tol = tol
+        self.max_iter = max_iter
+        self.preconditioner_size = preconditioner_size
 
         self.lambdas = np.empty(0)
         self.surface_velocity = np.empty(0)
         self.surface_cp = np.empty(0)
+        self.refinement_steps = 0
+        self.iterations = 0
+        # maximum normal velocity which is allowed on the surface
+        self.normal_tolerance = 1e-12
+        self.grid = None
+        # LU factorization of the normal and full tangential matrices
+        self.factorization = None
+        # low rank change of the factorized normal matrix (see update)
+        self.low_rank = None
+        self.multipole = None
+        self.rotation = Rotation.detect(self.geometry) if circulant else None
 
-        self.calc_lambdas()
+        if solve:
+            self.calc_lambdas()
 
         super().__init__('SPM {}'.format(figure.name))
 
-    def set_grid(self, grid: Grid):
+    @classmethod
+    def choose_solver(cls, solver: str, length: int,
+                      low_memory: bool = False,
+                      single_precision: bool = False,
+                      block_size: int = 0, symmetric: bool = False) -> str:
+        if solver != 'auto':
+            return solver
+        memory = cls.memory_estimate(length, low_memory, single_precision,
+                                     block_size, symmetric)
+        return 'gmres' if memory > cls.dense_memory_limit else 'dense'
+
+    @classmethod
+    def auto_block_size(cls, length: int) -> int:
+        """
+        Amount of rows which fits into the block memory.
+        """
+        row_bytes = cls.block_arrays * 8 * max(length, 1)
+        return int(min(max(cls.block_memory // row_bytes, 1), max(length, 1)))
+
+    @classmethod
+    def memory_estimate(cls, length: int, low_memory: bool = False,
+                        single_precision: bool = False,
+                        block_size: int = 0, symmetric: bool = False) -> int:
+        """
+        Returns expected peak memory in bytes
+        which is needed to solve the system.
+        Dense mode keeps normal and tangential matrices
+        and a copy which is made by the solver,
+        symmetric dense mode keeps half rows of them
+        and a half system with its copy,
+        low memory mode keeps only one factorized matrix.
+        Gmres doesn't need any matrix, so it is
+        estimated by calling iterative_memory_estimate.
+        """
+        block_size = block_size if block_size > 0 \
+            else cls.auto_block_size(length)
+        block = cls.block_arrays * 8 * block_size * length
+        if not low_memory and symmetric:
+            half = (length + 1) // 2
+            return 2 * 8 * half * (length + half) + block
+        if not low_memory:
+            return 3 * 8 * length ** 2 + block
+        item_size = 4 if single_precision else 8
+        return item_size * length ** 2 + block
+
+    @classmethod
+    def iterative_memory_estimate(cls, length: int, max_iter: int = 500,
+                                  preconditioner_size: int = 64,
+                                  block_size: int = 0) -> int:
+        """
+        Returns expected peak memory in bytes for gmres:
+        Krylov basis, preconditioner blocks and one block
+        of the matrix free operator.
+        """
+        block_size = block_size if block_size > 0 \
+            else cls.auto_block_size(length)
+        block = cls.block_arrays * 8 * block_size * length
+        basis = 8 * (min(max_iter, length, 20) + 2) * length
+        preconditioner = 8 * min(preconditioner_size, length) * length
+        return basis + preconditioner + block
+
+    def set_grid(self, grid: Grid, workers: int = None,
+                 operator: 'FieldOperator' = None, processes: int = None):
         """
         Calculates velocities at every point on the plot.
+        If the field operator of this figure and grid is given,
+        velocities are calculated by the matrix product.
+        If processes is given, velocities are calculated by
+        the pool of processes (see process_velocity).
         """
-        self.vx, self.vy = self.velocity(grid.xx, grid.yy)
+        self.grid = grid
+        calc = None
+        if operator is not None:
+            assert operator.matches(self, grid)
+
+            def calc():
+                return operator.velocity(self.lambdas, self.alpha,
+                                         self.v_inf)
+        elif processes is not None:
+            def calc():
+                return self.process_velocity(grid.xx, grid.yy, processes)
+        self.vx, self.vy = self.grid_velocity(grid, workers, calc)
         v = (self.vx ** 2 + self.vy ** 2) ** 0.5
         self.cp = 1.0 - (v / self.v_inf) ** 2
 
+    vectorized = True
+
+    def chunk_size(self) -> int:
+        return self.auto_block_size(self.geometry.length)
+
+    def process_velocity(self, xx: np.array, yy: np.array,
+                         processes: int = 0) -> tuple:
+        """
+        Calculates velocities at all points by the pool of
+        processes (0 - all cores). Geometry, lambdas, points and
+        output arrays are placed into shared memory, workers attach
+        them without copying and write their blocks in place,
+        only block bounds are sent to them.
+        Blocks are the same as in the velocity method.
+        """
+        xx, yy = np.asarray(xx, dtype=float), np.asarray(yy, dtype=float)
+        if xx.size == 0:
+            return np.zeros(xx.shape), np.zeros(xx.shape)
+        row, rows = self.block_rows(xx.shape)
+        arrays = {'x': xx.reshape(-1, row), 'y': yy.reshape(-1, row),
+                  'vx': np.zeros((xx.size // row, row)),
+                  'vy': np.zeros((xx.size // row, row)),
+                  'lambdas': self.lambdas}
+        for key, value in vars(self.geometry).items():
+            if isinstance(value, np.ndarray):
+                arrays['geometry.' + key] = value
+        parameters = {'method': type(self), 'geometry': type(self.geometry),
+                      'attributes': {key: value for key, value
+                                     in vars(self.geometry).items()
+                                     if not isinstance(value, np.ndarray)},
+                      'figure': self.figure, 'velocity': self.v_inf,
+                      'alpha': self.alpha,
+                      'far_field': (self.far_field_tolerance,
+                                    self.far_field_order,
+                                    self.far_field_cluster)}
+        starts = list(range(0, len(arrays['x']), rows))
+        stops = [start + rows for start in starts]
+        processes = min(processes or cpu_count() or 1, len(starts))
+        with SharedArrays(arrays) as shared, ProcessPoolExecutor(
+                processes, initializer=attach_shared_method,
+                initargs=(shared.spec, parameters)) as executor:
+            list(executor.map(shared_velocity_block, starts, stops,
+                              chunksize=max(len(starts) // processes // 4,
+                                            1)))
+            vx = shared.arrays['vx'].reshape(xx.shape).copy()
+            vy = shared.arrays['vy'].reshape(xx.shape).copy()
+        return vx, vy
+
+    def cache_key(self) -> tuple:
+        """
+        Field depends only on the figure, free stream and lambdas,
+        far field tolerance changes it a little. Points inside
+        the figure are found by its contains method, so the key
+        has the figure mask key too.
+        """
+        return (type(self).__name__, self.coordinates_hash(self.figure),
+                self.figure.mask_key(),
+                float(self.v_inf), float(self.alpha),
+                float(self.far_field_tolerance),
+                sha1(np.ascontiguousarray(self.lambdas).tobytes()).hexdigest())
+
+    @staticmethod
+    def coordinates_hash(figure: Figure) -> str:
+        return sha1(np.ascontiguousarray(figure.points,
+                                         dtype=float).tobytes()).hexdigest()
+
+    def save(self, path: str) -> None:
+        """
+        Saves solution and flow field (if set_grid was called)
+        to the directory. Every array is saved to its own npy file,
+        so big arrays can be memory mapped while loading,
+        other parameters are saved to the metadata.json file.
+        """
+        makedirs(path, exist_ok=True)
+        arrays = {'points': self.figure.points, 'lambdas': self.lambdas,
+                  'surface_cp': self.surface_cp,
+                  'surface_velocity': self.surface_velocity}
+        if self.grid is not None:
+            arrays.update(vx=self.vx, vy=self.vy, cp=self.cp)
+        for name, array in arrays.items():
+            np.save(join(path, name + '.npy'), array)
+        metadata = {
+            'figure': self.figure.name,
+            'alpha': float(self.alpha),
+            'velocity': float(self.v_inf),
+            'panels': int(self.geometry.length),
+            'geometry': type(self.geometry).__name__,
+            'solver': self.solver,
+            'hash': self.coordinates_hash(self.figure),
+            'grid': self.grid.spec() if self.grid is not None else None,
+            'arrays': sorted(arrays)}
+        with open(join(path, 'metadata.json'), 'w') as file:
+            json.dump(metadata, file, indent=4)
+
+    @classmethod
+    def load(cls, path: str, mmap: bool = True) -> 'SourcePanelMethod':
+        """
+        Loads solution which was saved by the save method.
+        Nothing is solved, loaded object calculates velocities
+        at new points immediately.
+        mmap - big arrays are not read into memory,
+        they are memory mapped.
+        """
+        with open(join(path, 'metadata.json')) as file:
+            metadata = json.load(file)
+        mode = 'r' if mmap else None
+        arrays = {name: np.load(join(path, name + '.npy'), mmap_mode=mode)
+                  for name in metadata['arrays']}
+        figure = Figure.from_points(metadata['figure'], arrays['points'])
+        assert cls.coordinates_hash(figure) == metadata['hash'], \
+            'Coordinates of {} are damaged'.format(path)
+        geometry_type = {'Geometry': Geometry,
+                         'CircleGeometry': CircleGeometry,
+                         'CurvedGeometry': CurvedGeometry}
+        alpha = metadata['alpha']
+        spm = cls.__new__(cls)
+        SourcePanelMethod.__init__(
+            spm, figure, metadata['velocity'], alpha,
+            geometry_type[metadata['geometry']](figure, alpha),
+            solver=metadata['solver'], solve=False)
+        assert spm.geometry.length == metadata['panels']
+        spm.lambdas = np.asarray(arrays['lambdas'])
+        spm.surface_cp = arrays['surface_cp']
+        spm.surface_velocity = arrays['surface_velocity']
+        if metadata['grid'] is not None:
+            spm.grid = Grid(**metadata['grid'])
+            spm.vx, spm.vy = arrays['vx'], arrays['vy']
+            spm.cp = arrays['cp']
+        return spm
+
+    @staticmethod
+    def saved(path: str) -> bool:
+        return exists(join(path, 'metadata.json'))
+
     def calc_velocity(self, x: float, y: float) -> tuple:
-        if self.figure.is_inside(x, y):
-            return 0.0, 0.0
+        x, y = np.asarray(x, dtype=float), np.asarray(y, dtype=float)
         coef = 1.0 / (2.0 * np.pi)
-        mx = np.empty(self.geometry.length)
-        my = np.empty(self.geometry.length)
-        self.calc_xy_integrand(mx, my, x, y)
-        n_summary = sum(self.lambdas * mx)
-        t_summary = sum(self.lambdas * my)
+        if self.far_field_tolerance > 0.0 and self.far_field() is not None:
+            n_summary, t_summary = self.far_field().velocity(
+                x, y, self.far_field_tolerance)
+        else:
+            mx, my = self.calc_field_block(x, y)
+            n_summary = mx @ self.lambdas
+            t_summary = my @ self.lambdas
         vx = self.v_inf * np.cos(self.alpha) + coef * n_summary
         vy = self.v_inf * np.sin(self.alpha) + coef * t_summary
-        return vx, vy
+        inside = self.figure.contains(x, y)
+        return np.where(inside, 0.0, vx), np.where(inside, 0.0, vy)
+
+    def far_field(self) -> FarField:
+        """
+        Multipole expansion of the current solution.
+        """
+        multipole = self.multipole
+        if multipole is None or multipole.lambdas is not self.lambdas or \
+                multipole.geometry is not self.geometry:
+            multipole = FarField(self.geometry, self.lambdas,
+                                 self.far_field_order, self.far_field_cluster)
+            self.multipole = multipole
+        return multipole
+
+    @staticmethod
+    def field_influence(source: Geometry, x: np.array, y: np.array) -> tuple:
+        """
+        Returns influence of every source panel on the x and y
+        velocity components at the given points.
+        Panels are added as the last axis.
+        """
+        x, y = np.asarray(x, dtype=float), np.asarray(y, dtype=float)
+        if x.ndim == 0:
+            mx, my = SourcePanelMethod.field_influence(
+                source, x[None], y[None])
+            return mx[0], my[0]
+        terms = source.integral_terms(x, y)
+        mx = source.integral(terms, 1.0, 0.0)
+        my = source.integral(terms, 0.0, 1.0)
+        return mx, my
+
+    def calc_field_block(self, x: np.array, y: np.array) -> tuple:
+        return self.field_influence(self.geometry, x, y)
 
     def calc_xy_integrand(self, mx: np.array, my: np.array,
                           x: float, y: float) -> None:
-        a = - (x - self.geometry.xi) * self.geometry.cos_fi \
-            - (y - self.geometry.yi) * self.geometry.sin_fi
-        b = (x - self.geometry.xi) ** 2 + (y - self.geometry.yi) ** 2
-        c_x = -self.geometry.cos_fi
-        c_y = -self.geometry.sin_fi
-        d_x = (x - self.geometry.xi)
-        d_y = (y - self.geometry.yi)
-        e_sqrt = b - a ** 2
-        e = np.empty(self.geometry.length)
-        for j, ei in enumerate(e_sqrt):
-            e[j] = e_sqrt[j] ** 0.5 if e_sqrt[j] > 0.0 else 0.0
+        mx[:], my[:] = self.calc_field_block(x, y)
 
-        for j in range(self.geometry.length):
-            mx[j] = self.integrand(-1, j, self.geometry.s[j],
-                                   a[j], b[j], c_x[j], d_x[j], e[j])
-            my[j] = self.integrand(-1, j, self.geometry.s[j],
-                                   a[j], b[j], c_y[j], d_y[j], e[j], 0.0)
+    @staticmethod
+    def surface_influence(target: Geometry, source: Geometry,
+                          normal: bool = True, tangent: bool = True,
+                          diagonal: int = None) -> tuple:
+        """
+        Calculates influence of the source panels on normal and
+        tangential velocities at control points of the target panels.
+        diagonal - index of the source panel which is the same as
+        the first target panel, target panels must be consecutive.
+        It is None if target and source panels are different.
+        Matrix which is not required is returned as None.
+        """
+        terms = source.integral_terms(target.xc, target.yc)
+        rows = np.arange(target.length)
+        mn, mt = None, None
+        if normal:
+            mn = source.integral(terms, -target.sin_fi, target.cos_fi)
+            if diagonal is not None:
+                mn[..., rows, rows + diagonal] = np.pi
+        if tangent:
+            mt = source.integral(terms, target.cos_fi, target.sin_fi)
+            if diagonal is not None:
+                mt[..., rows, rows + diagonal] = 0.0
+        return mn, mt
 
     @staticmethod
-    def integrand(i: int, j: int, s: float,
-                  a: float, b: float, c: float,
-                  d: float, e: float, equal: float = np.pi) -> float:
-        if i == j:
-            return equal
-        i0 = 0.5 * c
-        i1 = (s ** 2 + 2 * a * s + b) / b if b > 0.0 else 0.0
-        i2 = (d - a * c) / e if e > 0.0 else 0.0
-        i3 = (s + a) / e if e > 0.0 else 0.0
-        i4 = a / e if e > 0.0 else 0.0
-        i5 = i0 * np.log(i1)
-        i6 = i2 * (np.arctan(i3) - np.arctan(i4))
-        return i5 + i6
+    def own_panels(mn: np.array, mt: np.array, rows: np.array,
+                   columns: np.array) -> None:
+        """
+        Sets influence of panels on their own control points
+        (see surface_influence) to the given rows and columns.
+        """
+        mn[rows, columns] = np.pi
+        mt[rows, columns] = 0.0
+
+    def calc_surface_block(self, start: int, stop: int,
+                           normal: bool = True,
+                           tangent: bool = True) -> tuple:
+        """
+        Calculates rows from start to stop of
+        normal and tangential influence matrices.
+        Matrix which is not required is returned as None.
+        """
+        target = self.geometry.subset(slice(start, stop))
+        return self.surface_influence(target, self.geometry,
+                                      normal, tangent, start)
+
+    def blocks(self):
+        """
+        Yields start and stop rows of every block.
+        """
+        for start in range(0, self.geometry.length, self.block_size):
+            yield start, min(start + self.block_size, self.geometry.length)
 
     def calc_surface_integrand(self, mn: np.array, mt: np.array) -> None:
-        for i in range(self.geometry.length):
-            a = - (self.geometry.xc[i] - self.geometry.xi) * \
-                self.geometry.cos_fi \
-                - (self.geometry.yc[i] - self.geometry.yi) * \
-                self.geometry.sin_fi
-            b = (self.geometry.xc[i] - self.geometry.xi) ** 2 \
-                + (self.geometry.yc[i] - self.geometry.yi) ** 2
-            c_n = np.sin(self.geometry.fi[i] - self.geometry.fi)
-            c_t = -np.cos(self.geometry.fi[i] - self.geometry.fi)
-            d_n = - (self.geometry.xc[i] - self.geometry.xi) * \
-                self.geometry.sin_fi[i] \
-                + (self.geometry.yc[i] - self.geometry.yi) * \
-                self.geometry.cos_fi[i]
-            d_t = (self.geometry.xc[i] - self.geometry.xi) * \
-                self.geometry.cos_fi[i] \
-                + (self.geometry.yc[i] - self.geometry.yi) * \
-                self.geometry.sin_fi[i]
-            e_sqrt = b - a ** 2
-            e = np.empty(self.geometry.length)
-            for j, ei in enumerate(e_sqrt):
-                e[j] = e_sqrt[j] ** 0.5 if e_sqrt[j] > 0.0 else 0.0
-
-            for j in range(self.geometry.length):
-                mn[i][j] = self.integrand(i, j, self.geometry.s[j],
-                                          a[j], b[j], c_n[j], d_n[j], e[j])
-                mt[i][j] = self.integrand(i, j, self.geometry.s[j],
-                                          a[j], b[j], c_t[j], d_t[j], e[j], 0.0)
+        for start, stop in self.blocks():
+            mn[start:stop], mt[start:stop] = \
+                self.calc_surface_block(start, stop)
+
+    def circulant_spectra(self, tangent: bool = True) -> tuple:
+        """
+        Spectra of circulant normal and tangential influence
+        matrices, they are calculated by the first rows.
+        """
+        mn, mt = self.calc_surface_block(0, 1, tangent=tangent)
+        return Rotation.column(mn[0]), \
+            None if mt is None else Rotation.column(mt[0])
+
+    def normal_product(self, lambdas: np.array) -> np.array:
+        """
+        Product of normal influence matrix and lambdas,
+        matrix is calculated row block by row block.
+        """
+        if self.rotation is not None:
+            return Rotation.product(
+                self.circulant_spectra(tangent=False)[0], lambdas)
+        result = np.empty(self.geometry.length)
+        for start, stop in self.blocks():
+            mn, _ = self.calc_surface_block(start, stop, tangent=False)
+            result[start:stop] = mn @ lambdas
+        return result
+
+    def surface_products(self) -> tuple:
+        """
+        Products of normal and tangential influence matrices
+        and lambdas, calculated row block by row block.
+        """
+        if self.rotation is not None:
+            n_spectrum, t_spectrum = self.circulant_spectra()
+            return Rotation.product(n_spectrum, self.lambdas), \
+                Rotation.product(t_spectrum, self.lambdas)
+        n_summary = np.empty(self.geometry.length)
+        t_summary = np.empty(self.geometry.length)
+        for start, stop in self.blocks():
+            mn, mt = self.calc_surface_block(start, stop)
+            n_summary[start:stop] = mn @ self.lambdas
+            t_summary[start:stop] = mt @ self.lambdas
+        return n_summary, t_summary
 
     def calc_surface_cp(self, vn_inf: np.array, vt_inf: np.array,
-                        mn: np.array, mt: np.array):
+                        mn: np.array = None, mt: np.array = None):
+        """
+        Calculates pressure coefficient on the surface,
+        if matrices are not given they are calculated by blocks.
+        """
         coef = 1.0 / (2.0 * np.pi)
-        n_velocities = np.empty(self.geometry.length)
-        t_velocities = np.empty(self.geometry.length)
-        for i in range(self.geometry.length):
-            n_summary = sum(self.lambdas * mn[i])
-            t_summary = sum(self.lambdas * mt[i])
-            n_velocities[i] = coef * (vn_inf[i] + n_summary)
-            t_velocities[i] = coef * (vt_inf[i] + t_summary)
-        assert all(vn < 1e-12 for vn in n_velocities)
+        if mn is None or mt is None:
+            n_summary, t_summary = self.surface_products()
+        elif len(mn) < self.geometry.length:
+            n_summary, t_summary = self.symmetric_products(mn, mt)
+        else:
+            n_summary, t_summary = mn @ self.lambdas, mt @ self.lambdas
+        n_velocities = coef * (vn_inf + n_summary)
+        t_velocities = coef * (vt_inf + t_summary)
+        assert np.all(n_velocities < self.normal_tolerance)
+        self.surface_velocity = t_velocities
         self.surface_cp = 1.0 - (t_velocities / self.v_inf) ** 2
 
+    def report_memory(self) -> None:
+        if self.solver == 'gmres':
+            memory = self.iterative_memory_estimate(
+                self.geometry.length, self.max_iter,
+                self.preconditioner_size, self.block_size)
+        else:
+            memory = self.memory_estimate(
+                self.geometry.length, self.low_memory,
+                self.single_precision, self.block_size,
+                self.symmetry is not None)
+        if self.verbose:
+            print('SPM {}: {} panels, expected memory {:.1f} MB'
+                  .format(self.figure.name, self.geometry.length,
+                          memory / 1024 ** 2))
+
     def calc_lambdas(self):
         vn_inf = 2.0 * np.pi * self.v_inf * self.geometry.cos_de
         vt_inf = 2.0 * np.pi * self.v_inf * self.geometry.sin_de
+        if self.rotation is not None:
+            spectrum, _ = self.circulant_spectra(tangent=False)
+            self.lambdas = Rotation.solve(spectrum, -vn_inf)
+            self.calc_surface_cp(vn_inf, vt_inf)
+            return
+        self.report_memory()
+        if self.solver == 'gmres':
+            self.calc_iterative_lambdas(-vn_inf)
+            self.calc_surface_cp(vn_inf, vt_inf)
+            return
+        if self.low_memory:
+            self.calc_low_memory_lambdas(-vn_inf)
+            self.calc_surface_cp(vn_inf, vt_inf)
+            return
+        if self.symmetry is not None:
+            self.calc_symmetric_lambdas(vn_inf, vt_inf)
+            return
+
         mn = np.zeros(shape=(self.geometry.length,
                              self.geometry.length))
         mt = np.zeros(shape=(self.geometry.length,
@@ -177,14 +964,945 @@ class SourcePanelMethod(Flow):
 
         self.calc_surface_cp(vn_inf, vt_inf, mn, mt)
 
+    def calc_symmetric_lambdas(self, vn_inf: np.array,
+                               vt_inf: np.array) -> None:
+        """
+        Rows of the half panels are calculated, lambdas of the
+        symmetric free stream part are the same on mirror panels,
+        of the antisymmetric part they have opposite signs,
+        so columns of mirror panels are added or subtracted
+        and two half systems are solved.
+        """
+        symmetry = self.symmetry
+        half, pairs, single = symmetry.half, symmetry.pairs, symmetry.single
+        target = self.geometry.subset(half)
+        mn, mt = self.surface_influence(target, self.geometry)
+        rows = np.arange(len(half))
+        self.own_panels(mn, mt, rows, half)
+        mirror = mn[:, pairs[half]]
+        self.lambdas = np.zeros(self.geometry.length)
+        for sign, (ux, uy) in zip((1.0, -1.0), symmetry.split(self.alpha)):
+            rhs = 2.0 * np.pi * self.v_inf * (target.sin_fi * ux -
+                                              target.cos_fi * uy)
+            if not np.any(rhs):
+                continue
+            if sign > 0:
+                matrix = mn[:, half] + np.where(single, 0.0, mirror)
+                index = half
+            else:
+                # lambdas of panels which are mirrors of themselves are 0
+                keep = ~single
+                matrix = (mn[:, half] - mirror)[keep][:, keep]
+                index, rhs = half[keep], rhs[keep]
+            lambdas = np.zeros(self.geometry.length)
+            lambdas[pairs[index]] = sign * np.linalg.solve(matrix, rhs)
+            lambdas[index] = sign * lambdas[pairs[index]]
+            self.lambdas += lambdas
+        self.calc_surface_cp(vn_inf, vt_inf, mn, mt)
+
+    def symmetric_products(self, mn: np.array, mt: np.array) -> tuple:
+        """
+        Products of the full influence matrices and lambdas
+        by the rows of the half panels. Mirror panel of the
+        symmetric solution has the same normal velocity and
+        the opposite tangential one, antisymmetric solution
+        is the other way round.
+        """
+        half, pairs = self.symmetry.half, self.symmetry.pairs
+        symmetric = 0.5 * (self.lambdas + self.lambdas[pairs])
+        antisymmetric = self.lambdas - symmetric
+        n_s, n_a = mn @ symmetric, mn @ antisymmetric
+        t_s, t_a = mt @ symmetric, mt @ antisymmetric
+        n_summary = np.empty(self.geometry.length)
+        t_summary = np.empty(self.geometry.length)
+        n_summary[pairs[half]], t_summary[pairs[half]] = n_s - n_a, t_a - t_s
+        n_summary[half], t_summary[half] = n_s + n_a, t_s + t_a
+        return n_summary, t_summary
+
+    def calc_low_memory_lambdas(self, rhs: np.array) -> None:
+        """
+        Only normal influence matrix is stored and
+        factorized in place. For single precision
+        solution is refined with float64 residuals,
+        which are calculated by blocks.
+        """
+        dtype = np.float32 if self.single_precision else np.float64
+        mn = np.empty(shape=(self.geometry.length,
+                             self.geometry.length),
+                      dtype=dtype, order='F')
+        for start, stop in self.blocks():
+            mn[start:stop], _ = self.calc_surface_block(start, stop,
+                                                        tangent=False)
+        lu = lu_factor(mn, overwrite_a=True, check_finite=False)
+        self.lambdas = lu_solve(lu, rhs.astype(dtype)).astype(np.float64)
+        if not self.single_precision:
+            return
+
+        tolerance = 4.0 * np.finfo(np.float64).eps * np.linalg.norm(rhs)
+        previous = np.inf
+        for self.refinement_steps in range(1, self.max_refinement + 1):
+            residual = rhs - self.normal_product(self.lambdas)
+            norm = np.linalg.norm(residual)
+            if norm <= tolerance or norm >= 0.5 * previous:
+                break
+            previous = norm
+            self.lambdas += lu_solve(lu, residual.astype(dtype))
+
+    def preconditioner(self):
+        """
+        Block diagonal preconditioner, every block
+        contains influence of neighbour panels on each other.
+        """
+        factors = list()
+        length = self.geometry.length
+        for start in range(0, length, self.preconditioner_size):
+            stop = min(start + self.preconditioner_size, length)
+            panels = self.geometry.subset(slice(start, stop))
+            mn, _ = self.surface_influence(panels, panels,
+                                           tangent=False, diagonal=0)
+            factors.append((start, stop, lu_factor(mn)))
+
+        def solve(v: np.array) -> np.array:
+            v = np.ravel(v)
+            result = np.empty(length)
+            for start, stop, lu in factors:
+                result[start:stop] = lu_solve(lu, v[start:stop])
+            return result
+
+        return linear_operator((length, length), matvec=solve)
+
+    def calc_iterative_lambdas(self, rhs: np.array) -> None:
+        """
+        Solves the system by gmres with matrix free operator,
+        influence matrix is calculated by blocks on every iteration.
+        """
+        length = self.geometry.length
+        operator = linear_operator((length, length),
+                                   matvec=lambda v: self.normal_product(
+                                       np.ravel(v)))
+        self.iterations = 0
+
+        def count(_):
+            self.iterations += 1
+
+        self.lambdas, info = gmres(operator, rhs, rtol=self.tol,
+                                   maxiter=self.max_iter,
+                                   M=self.preconditioner(),
+                                   callback=count, callback_type='pr_norm')
+        assert info == 0, 'GMRES has not converged ' \
+                          'in {} iterations'.format(self.iterations)
+        self.normal_tolerance = max(self.normal_tolerance,
+                                    self.tol * np.linalg.norm(rhs))
+        if self.verbose:
+            print('SPM {}: GMRES converged in {} iterations'
+                  .format(self.figure.name, self.iterations))
+
+    def factorize(self) -> tuple:
+        """
+        Factorizes normal influence matrix and keeps it together
+        with tangential one, influence matrices don't depend
+        on alpha, so new alphas are solved by back substitution.
+        """
+        if self.factorization is None:
+            length = self.geometry.length
+            mn = np.empty((length, length), order='F')
+            mt = np.empty((length, length))
+            self.calc_surface_integrand(mn, mt)
+            self.factorization = (lu_factor(mn, overwrite_a=True,
+                                            check_finite=False), mt)
+            self.low_rank = None
+        return self.factorization
+
+    def solve_normal(self, rhs: np.array, trans: bool = False) -> np.array:
+        """
+        Solves the system with the factorized normal matrix
+        (transposed if trans is True). If matrix was changed by
+        the update method, Sherman-Morrison-Woodbury formula is used:
+        (A + U V^T)^-1 = A^-1 - A^-1 U (I + V^T A^-1 U)^-1 V^T A^-1.
+        """
+        lu, _ = self.factorize()
+        x = lu_solve(lu, rhs, trans=int(trans), check_finite=False)
+        if self.low_rank is None:
+            return x
+        u, v, inverse_u, capacitance = self.low_rank
+        if not trans:
+            return x - inverse_u @ lu_solve(capacitance, v.T @ x)
+        inverse_v = lu_solve(lu, v, trans=1, check_finite=False)
+        return x - inverse_v @ lu_solve(capacitance, u.T @ x, trans=1)
+
+    def panel_influence(self, geometry: Geometry, panels: np.array,
+                        others: np.array) -> tuple:
+        """
+        Rows and columns of the influence matrices of the given panels:
+        influence of all panels on the given ones and influence
+        of the given panels on the others.
+        """
+        target = geometry.subset(panels)
+        rows_n, rows_t = self.surface_influence(target, geometry)
+        index = np.arange(len(panels))
+        self.own_panels(rows_n, rows_t, index, panels)
+        columns_n, columns_t = self.surface_influence(
+            geometry.subset(others), target)
+        return rows_n, rows_t, columns_n, columns_t
+
+    def update(self, indexes: np.array, points: np.array) -> None:
+        """
+        Moves figure points with the given indexes to the new
+        positions and solves the flow again.
+        Only rows and columns of panels which contain moved points
+        are calculated, solution is updated by the low rank change
+        of the factorized matrix. If rank of all changes becomes
+        bigger than max_update_rank, matrix is factorized again.
+        Flow field is not recalculated, call set_grid again.
+        """
+        indexes = np.atleast_1d(indexes)
+        lu, mt = self.factorize()
+        new_points = np.array(self.figure.points)
+        new_points[indexes] = np.reshape(points, (len(indexes), 2))
+        figure = Figure.from_points(self.figure.name, new_points,
+                                    self.figure.x0, self.figure.y0,
+                                    self.figure.num_points)
+        geometry = type(self.geometry)(figure, self.alpha)
+        length = self.geometry.length
+        panels = np.unique(np.concatenate((indexes - 1, indexes)))
+        panels = panels[(panels >= 0) & (panels < length)]
+        others = np.setdiff1d(np.arange(length), panels)
+        rank = 2 * len(panels) + (0 if self.low_rank is None
+                                  else self.low_rank[0].shape[1])
+
+        if rank > max(self.max_update_rank * length, 1):
+            self.figure, self.geometry = figure, geometry
+            self.factorization = None
+            self.factorize()
+        else:
+            old = self.panel_influence(self.geometry, panels, others)
+            new = self.panel_influence(geometry, panels, others)
+            # change is U V^T, U = [E, C], V = [R^T, E],
+            # R - change of rows, C - change of columns
+            # of other panels, E - columns of identity matrix
+            identity = np.zeros((length, len(panels)))
+            identity[panels, np.arange(len(panels))] = 1.0
+            columns = np.zeros((length, len(panels)))
+            columns[others] = new[2] - old[2]
+            u = np.hstack((identity, columns))
+            v = np.hstack(((new[0] - old[0]).T, identity))
+            inverse_u = lu_solve(lu, u, check_finite=False)
+            if self.low_rank is not None:
+                u = np.hstack((self.low_rank[0], u))
+                v = np.hstack((self.low_rank[1], v))
+                inverse_u = np.hstack((self.low_rank[2], inverse_u))
+            capacitance = lu_factor(np.eye(u.shape[1]) + v.T @ inverse_u)
+            mt = mt.copy()
+            mt[panels] = new[1]
+            mt[others[:, None], panels] = new[3]
+            self.factorization = (lu, mt)
+            self.low_rank = (u, v, inverse_u, capacitance)
+            self.figure, self.geometry = figure, geometry
+        # moved points break rotational uniformity
+        self.rotation = None
+
+        lambdas, surface_velocity, surface_cp = self.solve_alphas(self.alpha)
+        self.lambdas = lambdas[:, 0]
+        self.surface_velocity = surface_velocity[:, 0]
+        self.surface_cp = surface_cp[:, 0]
+
+    def solve_alphas(self, alphas: np.array,
+                     velocity: float = None) -> tuple:
+        """
+        Solves all given alphas at once by the factorized matrix.
+        Returns lambdas, surface velocities and surface cp,
+        every column is a solution for one alpha.
+        """
+        velocity = self.v_inf if velocity is None else velocity
+        alphas = np.atleast_1d(np.asarray(alphas, dtype=float))
+        _, mt = self.factorize()
+        delta = self.geometry.betta[:, None] - alphas
+        vn_inf = 2.0 * np.pi * velocity * np.cos(delta)
+        vt_inf = 2.0 * np.pi * velocity * np.sin(delta)
+        lambdas = self.solve_normal(-vn_inf)
+        surface_velocity = (vt_inf + mt @ lambdas) / (2.0 * np.pi)
+        surface_cp = 1.0 - (surface_velocity / velocity) ** 2
+        return lambdas, surface_velocity, surface_cp
+
+    def partials(self, step: float = 1e-30) -> tuple:
+        """
+        Partial derivatives (lambdas are fixed) of the normal
+        residual rhs - mn @ lambdas and of the surface velocity
+        by every figure coordinate and by alpha.
+        Coordinate derivatives are calculated by the complex step,
+        every coordinate changes only two panels, so only their
+        rows and columns of influence matrices are recalculated.
+        Columns are in the order of figure.points.ravel().
+        """
+        geometry, lambdas = self.geometry, self.lambdas
+        length = geometry.length
+        points = np.asarray(self.figure.points, dtype=complex)
+        coef = 2.0 * np.pi * self.v_inf
+        d_residual = np.zeros((length, points.size))
+        d_velocity = np.zeros((length, points.size))
+        for k in range(len(points)):
+            panels = np.arange(max(k - 1, 0), min(k + 1, length))
+            others = np.setdiff1d(np.arange(length), panels)
+            for axis in (0, 1):
+                column = 2 * k + axis
+                changed = points.copy()
+                changed[k, axis] += 1j * step
+                changed = Geometry.from_coordinates(
+                    changed[:, 0], changed[:, 1], self.alpha)
+                target = changed.subset(panels)
+                mn, mt = self.surface_influence(target, changed,
+                                                diagonal=panels[0])
+                d_residual[panels, column] = \
+                    (-coef * target.cos_de - mn @ lambdas).imag / step
+                d_velocity[panels, column] = \
+                    (coef * target.sin_de + mt @ lambdas).imag / \
+                    (2.0 * np.pi * step)
+                mn, mt = self.surface_influence(changed.subset(others),
+                                                target)
+                d_residual[others, column] = \
+                    -(mn @ lambdas[panels]).imag / step
+                d_velocity[others, column] = \
+                    (mt @ lambdas[panels]).imag / (2.0 * np.pi * step)
+        alpha_residual = -coef * geometry.sin_de
+        alpha_velocity = -self.v_inf * geometry.cos_de
+        return d_residual, d_velocity, alpha_residual, alpha_velocity
+
+    def jacobian(self) -> tuple:
+        """
+        Derivatives of lambdas and surface cp by figure coordinates,
+        shape is (panels, points, 2), and by alpha.
+        All coordinates are solved at once by the factorized matrix.
+        Last point of the closed contour is the same as the first,
+        sum their derivatives if they should move together.
+        """
+        _, mt = self.factorize()
+        d_residual, d_velocity, alpha_residual, alpha_velocity = \
+            self.partials()
+        d_lambdas = self.solve_normal(np.column_stack((d_residual,
+                                                       alpha_residual)))
+        d_velocity = np.column_stack((d_velocity, alpha_velocity)) + \
+            mt @ d_lambdas / (2.0 * np.pi)
+        d_cp = -2.0 * self.surface_velocity[:, None] / \
+            self.v_inf ** 2 * d_velocity
+        shape = (self.geometry.length,) + self.figure.points.shape
+        return d_lambdas[:, :-1].reshape(shape), d_cp[:, :-1].reshape(shape), \
+            d_lambdas[:, -1], d_cp[:, -1]
+
+    def gradient(self, cp_weights: np.array = None,
+                 lambda_weights: np.array = None) -> tuple:
+        """
+        Gradient of cp_weights @ surface_cp + lambda_weights @ lambdas
+        by figure coordinates, shape is (points, 2), and by alpha.
+        Only one adjoint solve with the transposed
+        factorized matrix is required.
+        """
+        length = self.geometry.length
+        cp_weights = np.zeros(length) if cp_weights is None \
+            else np.asarray(cp_weights, dtype=float)
+        lambda_weights = np.zeros(length) if lambda_weights is None \
+            else np.asarray(lambda_weights, dtype=float)
+        _, mt = self.factorize()
+        g_velocity = -2.0 * cp_weights * self.surface_velocity / \
+            self.v_inf ** 2
+        g_lambdas = lambda_weights + mt.T @ g_velocity / (2.0 * np.pi)
+        adjoint = self.solve_normal(g_lambdas, trans=True)
+        d_residual, d_velocity, alpha_residual, alpha_velocity = \
+            self.partials()
+        gradient = g_velocity @ d_velocity + adjoint @ d_residual
+        alpha_gradient = g_velocity @ alpha_velocity + \
+            adjoint @ alpha_residual
+        return gradient.reshape(self.figure.points.shape), alpha_gradient
+
+    def field_operator(self, grid: Grid, path: str = '',
+                       workers: int = None) -> 'FieldOperator':
+        """
+        Creates field operator of this figure on the grid,
+        see FieldOperator.
+        """
+        return FieldOperator(self, grid, path, workers)
+
+    def with_alpha(self, alpha: float,
+                   velocity: float = None) -> 'SourcePanelMethod':
+        """
+        Returns the solution for the new alpha and velocity,
+        factorization is shared with this object.
+        """
+        velocity = self.v_inf if velocity is None else velocity
+        lambdas, surface_velocity, surface_cp = \
+            self.solve_alphas(alpha, velocity)
+        return self.solved(alpha, velocity, lambdas[:, 0],
+                           surface_velocity[:, 0], surface_cp[:, 0])
+
+    def solved(self, alpha: float, velocity: float, lambdas: np.array,
+               surface_velocity: np.array,
+               surface_cp: np.array) -> 'SourcePanelMethod':
+        """
+        Creates solution object with the given lambdas,
+        factorization is shared with this object.
+        """
+        spm = type(self).__new__(type(self))
+        SourcePanelMethod.__init__(
+            spm, self.figure, velocity, alpha,
+            type(self.geometry)(self.figure, alpha),
+            block_size=self.block_size, solver=self.solver, solve=False)
+        spm.factorization = self.factorization
+        spm.low_rank = self.low_rank
+        spm.lambdas = lambdas
+        spm.surface_velocity = surface_velocity
+        spm.surface_cp = surface_cp
+        return spm
+
 
 class SPMCircle(SourcePanelMethod):
+    """
+    Circle with uniformly spaced points is solved by FFT
+    (see Rotation), so the amount of panels might be very big.
+    """
     def __init__(self, figure: Figure, velocity: float, alpha: float = 0.0):
         geometry = CircleGeometry(figure, alpha)
-        super().__init__(figure, velocity, alpha, geometry)
+        super().__init__(figure, velocity, alpha, geometry, circulant=True)
 
     def calc_surface_cp(self, vn_inf: np.array, vt_inf: np.array,
-                        mn: np.array, mt: np.array):
+                        mn: np.array = None, mt: np.array = None):
         super().calc_surface_cp(vn_inf, vt_inf, mn, mt)
-        assert min(self.surface_cp) > -(3.0 + 1e-12) and \
-            max(self.surface_cp) < (1.0 + 1e-12)
+        # round off of panel integrals grows with the amount of panels
+        tolerance = 1e-15 * max(self.geometry.length, 1000)
+        assert min(self.surface_cp) > -(3.0 + tolerance) and \
+            max(self.surface_cp) < (1.0 + tolerance)
+
+
+class HigherOrderPanelMethod(SourcePanelMethod):
+    """
+    Higher order source panel method for smooth figures.
+    Panels are arcs of the spline through figure points and
+    strength of every panel is the parabola through control
+    strengths of the panel and its neighbours (see CurvedGeometry),
+    lambdas are strengths at control points as usual.
+    Integrals are calculated by gauss points of the panels.
+    cp error decreases as 1 / N^3 instead of 1 / N^2, so the
+    same accuracy needs fewer panels, but every panel costs
+    gauss_points times more (see higher_order_convergence_test).
+    Sharp corners like trailing edges are rounded by the spline,
+    points closer than a panel length to the surface have
+    bigger integration error.
+    Far field expansion is only for flat panels, so velocities
+    are always calculated by integrals. Moved point changes
+    the whole spline, so update factorizes the matrix again.
+    """
+    block_arrays = 6 * CurvedGeometry.gauss_points
+    max_update_rank = 0.0
+
+    def __init__(self, figure: Figure, velocity: float, alpha: float = 0.0,
+                 geometry: Geometry = None, **kwargs):
+        geometry = geometry if geometry else CurvedGeometry(figure, alpha)
+        super().__init__(figure, velocity, alpha, geometry, **kwargs)
+
+    @staticmethod
+    def strength_influence(source: CurvedGeometry, x: np.array,
+                           y: np.array, ux: np.array,
+                           uy: np.array) -> np.array:
+        """
+        Influence of control strengths of the source panels on the
+        velocity component along (ux, uy) at the given points.
+        Parabola of the panel depends on neighbour strengths,
+        so their columns get a part of its influence.
+        """
+        ux, uy = (np.broadcast_to(u, np.shape(x))[..., None, None]
+                  for u in (ux, uy))
+        dx = x[..., None, None] - source.gx
+        dy = y[..., None, None] - source.gy
+        kernel = (ux * dx + uy * dy) / (dx ** 2 + dy ** 2) * source.gw
+        moments = (kernel.sum(axis=-2),
+                   (kernel * source.sigma).sum(axis=-2),
+                   0.5 * (kernel * source.sigma ** 2).sum(axis=-2))
+        own = moments[0] + moments[1] * source.d_own + \
+            moments[2] * source.q_own
+        previous = moments[1] * source.d_previous + \
+            moments[2] * source.q_previous
+        following = moments[1] * source.d_next + moments[2] * source.q_next
+        own[..., 1:] += following[..., :-1]
+        own[..., :-1] += previous[..., 1:]
+        if source.closed:
+            own[..., 0] += following[..., -1]
+            own[..., -1] += previous[..., 0]
+        return own
+
+    @staticmethod
+    def field_influence(source: CurvedGeometry, x: np.array,
+                        y: np.array) -> tuple:
+        x, y = np.asarray(x, dtype=float), np.asarray(y, dtype=float)
+        influence = HigherOrderPanelMethod.strength_influence
+        return influence(source, x, y, 1.0, 0.0), \
+            influence(source, x, y, 0.0, 1.0)
+
+    @staticmethod
+    def surface_influence(target: CurvedGeometry, source: CurvedGeometry,
+                          normal: bool = True, tangent: bool = True,
+                          diagonal: int = None) -> tuple:
+        influence = HigherOrderPanelMethod.strength_influence
+        mn = influence(source, target.xc, target.yc, -target.sin_fi,
+                       target.cos_fi) if normal else None
+        mt = influence(source, target.xc, target.yc, target.cos_fi,
+                       target.sin_fi) if tangent else None
+        if diagonal is not None:
+            rows = np.arange(target.length)
+            HigherOrderPanelMethod.own_panels(mn, mt, rows, rows + diagonal)
+        return mn, mt
+
+    @staticmethod
+    def own_panels(mn: np.array, mt: np.array, rows: np.array,
+                   columns: np.array) -> None:
+        """
+        Gauss points are symmetric about the control point,
+        so they give the principal value of the tangential
+        integral, only half of the normal velocity jump
+        is added to the normal influence.
+        """
+        if mn is not None:
+            mn[rows, columns] += np.pi
+
+    def far_field(self) -> FarField:
+        return None
+
+    def partials(self, step: float = 1e-6) -> tuple:
+        """
+        The same as partials of SourcePanelMethod, but moved point
+        changes the whole spline, so derivatives are central
+        differences of full influence matrices.
+        The last point of the closed contour is moved together
+        with the first one, its columns are 0.
+        """
+        lambdas, length = self.lambdas, self.geometry.length
+        points = np.asarray(self.figure.points, dtype=float)
+        closed = self.geometry.closed
+        coef = 2.0 * np.pi * self.v_inf
+        d_residual = np.zeros((length, points.size))
+        d_velocity = np.zeros((length, points.size))
+        for k in range(len(points) - closed):
+            for axis in (0, 1):
+                results = list()
+                for sign in (1.0, -1.0):
+                    changed = points.copy()
+                    changed[k, axis] += sign * step
+                    if closed:
+                        changed[-1] = changed[0]
+                    geometry = type(self.geometry).from_coordinates(
+                        changed[:, 0], changed[:, 1], self.alpha)
+                    mn, mt = self.surface_influence(geometry, geometry,
+                                                    diagonal=0)
+                    results.append((-coef * geometry.cos_de - mn @ lambdas,
+                                    (coef * geometry.sin_de + mt @ lambdas) /
+                                    (2.0 * np.pi)))
+                column = 2 * k + axis
+                d_residual[:, column] = \
+                    (results[0][0] - results[1][0]) / (2.0 * step)
+                d_velocity[:, column] = \
+                    (results[0][1] - results[1][1]) / (2.0 * step)
+        alpha_residual = -coef * self.geometry.sin_de
+        alpha_velocity = -self.v_inf * self.geometry.cos_de
+        return d_residual, d_velocity, alpha_residual, alpha_velocity
+
+
+class MultiBodyPanelMethod(Flow):
+    """
+    Source panel method for several figures solved together.
+    Influence matrix consists of blocks, every block is an
+    influence of one figure on another one. Self influence
+    blocks don't change when figure is translated or rotated,
+    so they are cached and only blocks between different
+    figures are recalculated after the move method.
+    """
+    def __init__(self, figures: list, velocity: float, alpha: float = 0.0):
+        assert len(figures) > 0
+        self.figures = list(figures)
+        self.v_inf = velocity
+        self.alpha = alpha
+        self.geometries = [Geometry(f, alpha) for f in self.figures]
+        # (target, source) -> (normal, tangential) influence
+        self.influence = dict()
+        # amount of calculated blocks, shows how many blocks were reused
+        self.calculated_blocks = 0
+
+        self.lambdas = list()
+        self.surface_cp = list()
+
+        self.solve()
+
+        super().__init__('SPM {}'.format(
+            ', '.join(f.name for f in self.figures)))
+
+    @property
+    def bodies(self) -> int:
+        return len(self.figures)
+
+    def block(self, target: int, source: int) -> tuple:
+        """
+        Returns cached influence of the source figure panels
+        on the target figure control points.
+        """
+        if (target, source) not in self.influence:
+            diagonal = 0 if target == source else None
+            self.influence[(target, source)] = \
+                SourcePanelMethod.surface_influence(
+                    self.geometries[target], self.geometries[source],
+                    diagonal=diagonal)
+            self.calculated_blocks += 1
+        return self.influence[(target, source)]
+
+    def move(self, index: int, dx: float = 0.0, dy: float = 0.0,
+             angle: float = 0.0, xc: float = None, yc: float = None,
+             solve: bool = True) -> None:
+        """
+        Rotates figure by angle around (xc, yc) point,
+        which is figure center by default, and then moves it
+        by (dx, dy). Only blocks between this figure and
+        the others are recalculated.
+        """
+        figure = self.figures[index]
+        if xc is None or yc is None:
+            xc, yc = figure.center
+        self.figures[index] = figure.rotate(angle, xc, yc).translate(dx, dy)
+        self.geometries[index] = Geometry(self.figures[index], self.alpha)
+        for i in range(self.bodies):
+            if i != index:
+                self.influence.pop((index, i), None)
+                self.influence.pop((i, index), None)
+        if solve:
+            self.solve()
+
+    def solve(self) -> None:
+        coef = 1.0 / (2.0 * np.pi)
+        bodies = range(self.bodies)
+        mn = np.block([[self.block(i, j)[0] for j in bodies] for i in bodies])
+        vn_inf = np.concatenate([2.0 * np.pi * self.v_inf * g.cos_de
+                                 for g in self.geometries])
+        lambdas = np.linalg.solve(mn, -vn_inf)
+        offsets = np.cumsum([0] + [g.length for g in self.geometries])
+        self.lambdas = [lambdas[offsets[i]:offsets[i + 1]] for i in bodies]
+
+        self.surface_cp = list()
+        for i in bodies:
+            n_summary = sum(self.block(i, j)[0] @ self.lambdas[j]
+                            for j in bodies)
+            t_summary = sum(self.block(i, j)[1] @ self.lambdas[j]
+                            for j in bodies)
+            geometry = self.geometries[i]
+            n_velocities = coef * (2.0 * np.pi * self.v_inf *
+                                   geometry.cos_de + n_summary)
+            t_velocities = coef * (2.0 * np.pi * self.v_inf *
+                                   geometry.sin_de + t_summary)
+            assert np.all(n_velocities < 1e-12)
+            self.surface_cp.append(1.0 - (t_velocities / self.v_inf) ** 2)
+
+    def cache_key(self) -> tuple:
+        return (type(self).__name__,
+                tuple(SourcePanelMethod.coordinates_hash(f)
+                      for f in self.figures),
+                tuple(f.mask_key() for f in self.figures),
+                float(self.v_inf), float(self.alpha),
+                sha1(np.concatenate(self.lambdas).tobytes()).hexdigest())
+
+    def set_grid(self, grid: Grid, workers: int = None):
+        """
+        Calculates velocities at every point on the plot.
+        """
+        self.vx, self.vy = self.grid_velocity(grid, workers)
+        v = (self.vx ** 2 + self.vy ** 2) ** 0.5
+        self.cp = 1.0 - (v / self.v_inf) ** 2
+
+    vectorized = True
+
+    def chunk_size(self) -> int:
+        return SourcePanelMethod.auto_block_size(
+            max(g.length for g in self.geometries))
+
+    def calc_velocity(self, x: float, y: float) -> tuple:
+        x, y = np.asarray(x, dtype=float), np.asarray(y, dtype=float)
+        coef = 1.0 / (2.0 * np.pi)
+        vx = self.v_inf * np.cos(self.alpha) + np.zeros(x.shape)
+        vy = self.v_inf * np.sin(self.alpha) + np.zeros(x.shape)
+        inside = np.zeros(x.shape, dtype=bool)
+        for figure, geometry, lambdas in zip(self.figures, self.geometries,
+                                             self.lambdas):
+            mx, my = SourcePanelMethod.field_influence(geometry, x, y)
+            vx += coef * (mx @ lambdas)
+            vy += coef * (my @ lambdas)
+            inside |= figure.contains(x, y)
+        return np.where(inside, 0.0, vx), np.where(inside, 0.0, vy)
+
+
+class BatchPanelMethod:
+    """
+    Source panel method for a stack of figures with the same
+    amount of points, for example a family of ellipses or
+    airfoils of a design sweep.
+    x, y - (B, N + 1) contour coordinates of B figures;
+    alpha - one angle or B angles;
+    chunk_size - amount of figures which are solved together,
+    it is chosen by the chunk_memory if it equals 0.
+    Geometry and (b, N, N) influence matrices of the chunk
+    are calculated at once and solved by one stacked solve.
+    lambdas, surface_velocity and surface_cp are (B, N) arrays.
+    """
+    # memory which is allowed for temporary arrays of one chunk,
+    # integrals of bigger chunks run out of the processor cache
+    chunk_memory = 8 * 1024 ** 2
+
+    def __init__(self, x: np.array, y: np.array, velocity: float,
+                 alpha: np.array = 0.0, chunk_size: int = 0,
+                 names: list = None):
+        x, y = np.asarray(x, dtype=float), np.asarray(y, dtype=float)
+        assert x.ndim == 2 and x.shape == y.shape and x.shape[1] > 2
+        self.x, self.y = x, y
+        self.v_inf = velocity
+        self.alpha = np.broadcast_to(np.asarray(alpha, dtype=float),
+                                     (len(x),))
+        self.names = names
+        length = x.shape[1] - 1
+        self.chunk_size = chunk_size if chunk_size > 0 \
+            else self.auto_chunk_size(length)
+        self.lambdas = np.empty((len(x), length))
+        self.surface_velocity = np.empty((len(x), length))
+        self.surface_cp = np.empty((len(x), length))
+        # maximum normal velocity which is allowed on the surface
+        self.normal_tolerance = 1e-12
+        for start in range(0, len(x), self.chunk_size):
+            self.solve_chunk(slice(start, start + self.chunk_size))
+
+    @classmethod
+    def from_figures(cls, figures: list, velocity: float,
+                     alpha: np.array = 0.0,
+                     chunk_size: int = 0) -> 'BatchPanelMethod':
+        """
+        Stacks coordinates of the figures,
+        all of them must have the same amount of points.
+        """
+        x = np.array([f.x for f in figures])
+        y = np.array([f.y for f in figures])
+        return cls(x, y, velocity, alpha, chunk_size,
+                   [f.name for f in figures])
+
+    @classmethod
+    def auto_chunk_size(cls, length: int) -> int:
+        """
+        Amount of figures whose matrices fit into the chunk memory.
+        """
+        size = SourcePanelMethod.block_arrays * 8 * length ** 2
+        return int(max(cls.chunk_memory // size, 1))
+
+    def __len__(self):
+        return len(self.x)
+
+    def solve_chunk(self, chunk: slice) -> None:
+        coef = 1.0 / (2.0 * np.pi)
+        geometry = Geometry.from_coordinates(self.x[chunk], self.y[chunk],
+                                             self.alpha[chunk, None])
+        mn, mt = SourcePanelMethod.surface_influence(geometry, geometry,
+                                                     diagonal=0)
+        vn_inf = 2.0 * np.pi * self.v_inf * geometry.cos_de
+        vt_inf = 2.0 * np.pi * self.v_inf * geometry.sin_de
+        lambdas = np.linalg.solve(mn, -vn_inf[..., None])
+        n_velocities = coef * (vn_inf + (mn @ lambdas)[..., 0])
+        t_velocities = coef * (vt_inf + (mt @ lambdas)[..., 0])
+        assert np.all(n_velocities < self.normal_tolerance)
+        self.lambdas[chunk] = lambdas[..., 0]
+        self.surface_velocity[chunk] = t_velocities
+        self.surface_cp[chunk] = 1.0 - (t_velocities / self.v_inf) ** 2
+
+    def method(self, index: int) -> SourcePanelMethod:
+        """
+        Returns solution of one figure, it calculates
+        velocities out of the surface as usual.
+        """
+        name = self.names[index] if self.names else 'Batch {}'.format(index)
+        figure = Figure(name, self.x[index], self.y[index],
+                        num_points=self.x.shape[1])
+        alpha = float(self.alpha[index])
+        spm = SourcePanelMethod(figure, self.v_inf, alpha, solve=False)
+        spm.lambdas = self.lambdas[index]
+        spm.surface_velocity = self.surface_velocity[index]
+        spm.surface_cp = self.surface_cp[index]
+        return spm
+
+
+class SharedArrays:
+    """
+    Copies of the arrays in shared memory blocks.
+    spec describes every block, other processes
+    attach arrays by it without copying (see attach).
+    Blocks are removed by the close method,
+    views of them mustn't be used after it.
+    """
+    def __init__(self, arrays: dict):
+        self.blocks, self.arrays, self.spec = dict(), dict(), dict()
+        try:
+            for name, array in arrays.items():
+                array = np.asarray(array)
+                block = SharedMemory(create=True, size=max(array.nbytes, 1))
+                self.blocks[name] = block
+                self.arrays[name] = np.ndarray(array.shape, array.dtype,
+                                               buffer=block.buf)
+                self.arrays[name][...] = array
+                self.spec[name] = (block.name, array.shape, array.dtype.str)
+        except BaseException:
+            self.close()
+            raise
+
+    @staticmethod
+    def attach(spec: dict) -> tuple:
+        """
+        Returns blocks and arrays of the spec,
+        blocks must be kept while arrays are used.
+        """
+        blocks, arrays = dict(), dict()
+        for name, (block_name, shape, dtype) in spec.items():
+            blocks[name] = SharedMemory(block_name)
+            arrays[name] = np.ndarray(shape, dtype, buffer=blocks[name].buf)
+        return blocks, arrays
+
+    def close(self) -> None:
+        self.arrays = dict()
+        for block in self.blocks.values():
+            block.close()
+            block.unlink()
+        self.blocks = dict()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+# shared arrays and the solution of the worker process
+shared_method = dict()
+
+
+def attach_shared_method(spec: dict, parameters: dict) -> None:
+    """
+    Initializer of the worker process: attaches shared arrays
+    and creates the solution which uses them.
+    """
+    blocks, arrays = SharedArrays.attach(spec)
+    geometry = parameters['geometry'].__new__(parameters['geometry'])
+    for name, array in arrays.items():
+        if name.startswith('geometry.'):
+            setattr(geometry, name[len('geometry.'):], array)
+    for name, value in parameters['attributes'].items():
+        setattr(geometry, name, value)
+    spm = parameters['method'].__new__(parameters['method'])
+    spm.figure = parameters['figure']
+    spm.geometry = geometry
+    spm.lambdas = arrays['lambdas']
+    spm.v_inf, spm.alpha = parameters['velocity'], parameters['alpha']
+    spm.far_field_tolerance, spm.far_field_order, \
+        spm.far_field_cluster = parameters['far_field']
+    spm.multipole = None
+    shared_method.update(blocks=blocks, arrays=arrays, method=spm)
+
+
+def shared_velocity_block(start: int, stop: int) -> None:
+    """
+    Calculates velocities of rows from start to stop
+    and writes them into the shared output arrays.
+    """
+    arrays, spm = shared_method['arrays'], shared_method['method']
+    vx, vy = spm.calc_velocity(arrays['x'][start:stop].ravel(),
+                               arrays['y'][start:stop].ravel())
+    arrays['vx'][start:stop].reshape(-1)[:] = vx
+    arrays['vy'][start:stop].reshape(-1)[:] = vy
+
+
+class FieldOperator:
+    """
+    Field influence matrices of the panel method on the grid points.
+    Matrices depend only on the figure and the grid,
+    so flow fields of new solutions (alphas, velocities)
+    are calculated by the matrix product without integrals.
+    spm - solved or not solved panel method;
+    path - directory where matrices are memory mapped,
+    if it contains matrices of the same figure and grid
+    they are opened without calculation;
+    workers - amount of threads which calculate blocks.
+    """
+    def __init__(self, spm: SourcePanelMethod, grid: Grid,
+                 path: str = '', workers: int = None):
+        self.hash = spm.coordinates_hash(spm.figure)
+        self.grid_spec = grid.spec()
+        self.shape = grid.xx.shape
+        self.panels = spm.geometry.length
+        self.path = path
+        if path and self.saved():
+            self.mx, self.my, self.inside = (
+                np.load(join(path, name + '.npy'), mmap_mode='r')
+                for name in ('mx', 'my', 'inside'))
+            return
+        self.mx, self.my = (self.allocate(name) for name in ('mx', 'my'))
+        x, y = grid.xx.ravel(), grid.yy.ravel()
+        self.calc_blocks(spm, x, y, workers)
+        self.inside = spm.figure.contains(x, y)
+        if path:
+            np.save(join(path, 'inside.npy'), self.inside)
+            self.mx.flush()
+            self.my.flush()
+            with open(join(path, 'metadata.json'), 'w') as file:
+                json.dump(self.metadata(), file, indent=4)
+
+    def metadata(self) -> dict:
+        return {'hash': self.hash, 'grid': self.grid_spec,
+                'panels': self.panels}
+
+    def saved(self) -> bool:
+        file = join(self.path, 'metadata.json')
+        if not exists(file):
+            return False
+        with open(file) as file:
+            return json.load(file) == self.metadata()
+
+    def allocate(self, name: str) -> np.array:
+        size = (int(np.prod(self.shape)), self.panels)
+        if not self.path:
+            return np.empty(size)
+        makedirs(self.path, exist_ok=True)
+        return np.lib.format.open_memmap(join(self.path, name + '.npy'),
+                                         mode='w+', shape=size)
+
+    def calc_blocks(self, spm: SourcePanelMethod, x: np.array,
+                    y: np.array, workers: int = None) -> None:
+        step = spm.chunk_size()
+        starts = range(0, len(x), step)
+
+        def calc(start: int) -> None:
+            part = slice(start, start + step)
+            self.mx[part], self.my[part] = spm.field_influence(
+                spm.geometry, x[part], y[part])
+
+        workers = spm.workers if workers is None else workers
+        workers = min(workers or cpu_count() or 1, len(starts))
+        if workers > 1:
+            with ThreadPoolExecutor(workers) as executor:
+                list(executor.map(calc, starts))
+        else:
+            for start in starts:
+                calc(start)
+
+    def matches(self, spm: SourcePanelMethod, grid: Grid) -> bool:
+        return self.hash == spm.coordinates_hash(spm.figure) and \
+            self.grid_spec == grid.spec()
+
+    def velocity(self, lambdas: np.array, alpha: np.array,
+                 velocity: np.array) -> tuple:
+        """
+        Velocities on the grid for the given solution.
+        lambdas might be a matrix, every column is a solution
+        (for example from solve_alphas), then alpha and velocity
+        are arrays and the last axis of result is the solution.
+        """
+        coef = 1.0 / (2.0 * np.pi)
+        lambdas = np.asarray(lambdas)
+        vx = np.cos(alpha) * velocity + coef * (self.mx @ lambdas)
+        vy = np.sin(alpha) * velocity + coef * (self.my @ lambdas)
+        inside = self.inside.reshape((-1,) + (1,) * (lambdas.ndim - 1))
+        vx, vy = np.where(inside, 0.0, vx), np.where(inside, 0.0, vy)
+        shape = self.shape + lambdas.shape[1:]
+        return vx.reshape(shape), vy.reshape(shape)
@@ -2,9 +2,18 @@ from plot import Plot
 import figure
 import flow
 from circulation import Circulation
-from os import listdir
+from scene import Scene
+from airfoil_index import AirfoilIndex
+from wake import VortexWake
+from service import PanelService
+from animation import FlowAnimation
+from os import listdir, makedirs
 import numpy as np
-from source_panel_method import SPMCircle, SourcePanelMethod, Geometry
+import subprocess
+import sys
+from time import time
+from source_panel_method import SPMCircle, SourcePanelMethod, Geometry, \
+    MultiBodyPanelMethod, BatchPanelMethod, HigherOrderPanelMethod
 
 
 def circulation_flow_figure_test() -> None:
@@ -224,6 +233,588 @@ def grid_source_panel_method_test():
     plt.show()
 
 
+def low_memory_spm_test():
+    """
+    This test compares dense source panel method
+    with the low memory mode, where influence matrix
+    is factorized in float32 and solution is refined.
+    """
+    fgr = figure.Ellipse(10, 3, num_points=1000)
+    print('Expected memory: dense {:.1f} MB, low memory {:.1f} MB'.format(
+        SourcePanelMethod.memory_estimate(1000) / 1024 ** 2,
+        SourcePanelMethod.memory_estimate(1000, True, True) / 1024 ** 2))
+
+    dense = SourcePanelMethod(fgr, 1, 0.1)
+    low = SourcePanelMethod(fgr, 1, 0.1, low_memory=True,
+                            single_precision=True, verbose=True)
+
+    print('Refinement steps:', low.refinement_steps)
+    print('Lambdas difference:', max(abs(dense.lambdas - low.lambdas)))
+    print('Cp difference:', max(abs(dense.surface_cp - low.surface_cp)))
+
+
+def iterative_spm_test():
+    """
+    This test solves source panel method by gmres
+    with matrix free operator and compares it
+    with the dense solution.
+    """
+    fgr = figure.Ellipse(10, 3, num_points=1000)
+    dense = SourcePanelMethod(fgr, 1, 0.1, solver='dense')
+    iterative = SourcePanelMethod(fgr, 1, 0.1, solver='gmres',
+                                  tol=1e-12, verbose=True)
+
+    print('Iterations:', iterative.iterations)
+    print('Cp difference:', max(abs(dense.surface_cp - iterative.surface_cp)))
+
+
+def multi_body_spm_test():
+    """
+    This test moves a small flap behind the main body,
+    only blocks between two bodies are recalculated
+    on every step.
+    """
+    main = figure.Ellipse(5, 1, num_points=120)
+    flap = figure.Ellipse(1.5, 0.3, 6.5, -1.0, num_points=60)
+    spm = MultiBodyPanelMethod([main, flap], 1)
+
+    for step in range(10):
+        spm.move(1, dy=-0.1, angle=-0.02)
+        print(step, 'min cp: {:.3f}, calculated blocks: {}'
+              .format(min(spm.surface_cp[0]), spm.calculated_blocks))
+
+    grid = figure.Grid(0.0, 0.0, 20.0, 20.0, 30)
+    spm.set_grid(grid)
+    plt = Plot(grid)
+    for fgr in spm.figures:
+        plt.plot_filled_figure(fgr)
+    plt.plot_stream_line(spm)
+    plt.show()
+
+
+def figure_batch_test():
+    """
+    This test creates a lot of ellipses for a design sweep,
+    geometry of all figures is calculated at once.
+    """
+    a, b = np.meshgrid(np.linspace(1.0, 5.0, 500),
+                       np.linspace(0.1, 1.0, 200))
+    start = time()
+    ellipses = figure.Ellipse.batch_ellipses(a, b, num_points=60)
+    print('{} ellipses: {:.2f} s'.format(len(ellipses), time() - start))
+
+    rotated = ellipses[-1].rotate(0.25 * np.pi)
+    print('Perimeter: {:.3f}, rotated bbox: {}'
+          .format(rotated.arclength[-1], rotated.bbox))
+
+
+def scene_mask_test():
+    """
+    This test masks big grid against hundreds of figures,
+    every grid point is checked only with figures
+    whose bounding boxes contain it.
+    """
+    rng = np.random.default_rng(0)
+    centers = rng.uniform(-90.0, 90.0, (300, 2))
+    radii = rng.uniform(0.5, 3.0, 300)
+    figures = [figure.Circle(r, x, y, num_points=40)
+               for (x, y), r in zip(centers, radii)]
+    scene = Scene(figures)
+
+    grid = figure.Grid(0.0, 0.0, 200.0, 200.0, 500)
+    start = time()
+    mask = scene.mask(grid)
+    print('Masked {} points: {:.3f} s'.format(mask.size, time() - start))
+    print('Figures near the origin:', scene.intersecting(-10, -10, 10, 10))
+
+    plt = Plot(grid)
+    plt.plot_point(grid.xx[mask], grid.yy[mask], ',k')
+    plt.show()
+
+
+def airfoil_index_test():
+    """
+    This test finds airfoils by their features.
+    Index is built on the first run, next runs only load it.
+    """
+    # Write your own path here
+    path = r'C:\Users\User\Documents\python\aero\airfoils_data'
+    index = AirfoilIndex.open(path)
+
+    start = time()
+    names = index.query(thickness=(0.115, 0.125),
+                        camber_position=(0.25, 0.35))
+    print('Query: {:.2f} ms'.format(1000 * (time() - start)))
+    print(names)
+
+    print('Nearest to naca2412:', index.nearest('naca2412.txt'))
+    print('Nearest by features:',
+          index.nearest_features(thickness=0.12, camber=0.02,
+                                 camber_position=0.3))
+
+
+def naca_airfoil_test():
+    """
+    This test creates NACA airfoils analytically,
+    without any files and internet connection.
+    """
+    # Thousands of 4 digit airfoils at once
+    m, p, t = np.meshgrid(np.linspace(0.0, 0.06, 30),
+                          np.linspace(0.2, 0.6, 10),
+                          np.linspace(0.06, 0.2, 10))
+    start = time()
+    coordinates = figure.NacaAirfoil.stacked_four_digit(m, p, t, 100)
+    print('{} airfoils: {:.3f} s'.format(len(coordinates), time() - start))
+
+    airfoils = figure.NacaAirfoil.batch_airfoils(
+        ['0012', '2412', '4415', '23012', '23112'], 80, closed_te=True)
+    grid = figure.Grid(0.5, 0.0, 1.2, 0.6)
+    plt = Plot(grid)
+    for airfoil, style in zip(airfoils, ('k', 'r', 'b', 'g', 'm')):
+        plt.plot_figure(airfoil, style)
+    plt.show()
+
+
+def wake_benchmark_test():
+    """
+    This test moves the point vortex wake behind the lifting cylinder
+    and compares speed of direct sum and tree-code.
+    """
+    rng = np.random.default_rng(0)
+    for n in (1000, 4000, 16000):
+        x, y = rng.uniform(2.0, 10.0, n), rng.uniform(-2.0, 2.0, n)
+        gamma = rng.normal(0.0, 0.1, n)
+        for name, threshold in (('direct', n), ('tree', 0)):
+            wake = VortexWake(core=0.05, tree_threshold=threshold)
+            wake.add(x, y, gamma)
+            start = time()
+            wake.step(0.01)
+            print('{:6d} vortices, {}: {:.2f} steps/s'
+                  .format(n, name, 1.0 / (time() - start)))
+
+    cylinder = flow.LiftingCylinderFlow(2, 5, 15)
+    wake = VortexWake(cylinder, core=0.05)
+    wake.run(200, 0.02, shed_point=(1.5, 0.0), shed_gamma=0.2)
+    grid = figure.Grid(4.0, 0.0, 12.0, 6.0)
+    cylinder.set_grid(grid)
+    plt = Plot(grid)
+    plt.plot_flow(cylinder)
+    plt.plot_figure(figure.Circle(cylinder.non_lift.rad), 'k')
+    plt.plot_points(wake.x, wake.y, 'r.')
+    plt.show()
+
+
+def threaded_grid_test():
+    """
+    This test calculates the flow over the airfoil on the big grid
+    with different amount of threads, results are the same.
+    """
+    airfoil = figure.NacaAirfoil('2412', 200)
+    spm = SourcePanelMethod(airfoil, 1.0, np.radians(4.0))
+    grid = figure.Grid(0.5, 0.0, 2.0, 1.0, 600)
+    for workers in (1, 2, 4, 0):
+        start = time()
+        vx, vy = spm.velocity(grid.xx, grid.yy, workers)
+        print('workers = {}: {:.3f} s'.format(workers, time() - start))
+
+    random = flow.RandomFlow(1.0, seed=1)
+    print('Random flow is the same:',
+          np.array_equal(random.velocity(grid.xx, grid.yy, 1),
+                         random.velocity(grid.xx, grid.yy, 4)))
+
+
+def save_load_spm_test():
+    """
+    This test solves the airfoil once and saves the solution,
+    next time the solution is only loaded.
+    """
+    path = 'spm_naca2412'
+    if SourcePanelMethod.saved(path):
+        spm = SourcePanelMethod.load(path)
+    else:
+        airfoil = figure.NacaAirfoil('2412', 200)
+        spm = SourcePanelMethod(airfoil, 1.0, np.radians(4.0))
+        spm.set_grid(figure.Grid(0.5, 0.0, 2.0, 1.0, 200))
+        spm.save(path)
+
+    plt = Plot(spm.grid)
+    plt.plot_contour(spm)
+    plt.plot_figure(spm.figure)
+    plt.show()
+
+
+def panel_service_test():
+    """
+    This test starts the panel service on the localhost
+    and measures how fast it answers.
+    """
+    import json
+    from urllib.request import urlopen, Request
+    from concurrent.futures import ThreadPoolExecutor
+
+    server, url = PanelService(panels=150).start()
+
+    def post(path: str, data: dict) -> dict:
+        request = Request(url + path, json.dumps(data).encode(),
+                          {'Content-Type': 'application/json'})
+        with urlopen(request) as response:
+            return json.loads(response.read())
+
+    for alpha in (0.05, 0.05, 0.1):
+        start = time()
+        post('/cp', {'airfoil': 'naca2412', 'alpha': alpha})
+        print('alpha = {}: {:.1f} ms'.format(alpha, 1e3 * (time() - start)))
+
+    alphas = np.radians(np.linspace(-10.0, 10.0, 41))
+    start = time()
+    with ThreadPoolExecutor(8) as executor:
+        list(executor.map(lambda a: post('/cp', {'airfoil': 'naca0012',
+                                                 'alpha': a}), alphas))
+    print('{} concurrent alphas: {:.1f} ms'
+          .format(len(alphas), 1e3 * (time() - start)))
+    print(post('/velocity', {'airfoil': 'naca2412', 'alpha': 0.1,
+                             'x': [1.5, -0.5], 'y': [0.2, 0.0]}))
+    print(json.loads(urlopen(url + '/stats').read()))
+    server.shutdown()
+
+
+def adjoint_sensitivity_test():
+    """
+    This test compares adjoint gradient and jacobian
+    of the airfoil solution with finite differences.
+    """
+    airfoil = figure.NacaAirfoil('2412', 30)
+    alpha, h = 0.1, 1e-6
+    spm = SourcePanelMethod(airfoil, 1.0, alpha)
+    rng = np.random.default_rng(0)
+    weights = rng.normal(size=spm.geometry.length)
+    gradient, alpha_gradient = spm.gradient(weights)
+    d_lambdas, d_cp, _, _ = spm.jacobian()
+
+    def solve(points: np.array, a: float) -> SourcePanelMethod:
+        return SourcePanelMethod(figure.Figure.from_points('NACA', points),
+                                 1.0, a)
+
+    points = np.array(airfoil.points)
+    for k, axis in ((5, 1), (17, 0), (30, 1), (45, 0)):
+        plus, minus = points.copy(), points.copy()
+        plus[k, axis] += h
+        minus[k, axis] -= h
+        plus, minus = solve(plus, alpha), solve(minus, alpha)
+        fd = (weights @ plus.surface_cp - weights @ minus.surface_cp) / (2 * h)
+        fd_lambdas = (plus.lambdas - minus.lambdas) / (2 * h)
+        print('point {} axis {}: adjoint {:.8f}, finite difference {:.8f}'
+              .format(k, axis, gradient[k, axis], fd))
+        assert abs(gradient[k, axis] - fd) < 1e-5 * max(abs(fd), 1.0)
+        assert np.allclose(d_lambdas[:, k, axis], fd_lambdas,
+                           rtol=1e-5, atol=1e-5)
+
+    plus, minus = solve(points, alpha + h), solve(points, alpha - h)
+    fd = (weights @ plus.surface_cp - weights @ minus.surface_cp) / (2 * h)
+    print('alpha: adjoint {:.8f}, finite difference {:.8f}'
+          .format(alpha_gradient, fd))
+    assert abs(alpha_gradient - fd) < 1e-5 * max(abs(fd), 1.0)
+
+
+def low_rank_update_test():
+    """
+    This test moves a few airfoil points several times
+    and compares low rank update with the full solution.
+    """
+    airfoil = figure.NacaAirfoil('2412', 400)
+    spm = SourcePanelMethod(airfoil, 1.0, np.radians(4.0))
+    spm.factorize()
+    points = np.array(airfoil.points)
+    rng = np.random.default_rng(0)
+    for _ in range(5):
+        indexes = rng.choice(np.arange(10, len(points) - 10), 3,
+                             replace=False)
+        points[indexes] += rng.normal(scale=2e-3, size=(3, 2))
+        start = time()
+        spm.update(indexes, points[indexes])
+        update_time = time() - start
+        start = time()
+        full = SourcePanelMethod(
+            figure.Figure.from_points('NACA', points),
+            1.0, np.radians(4.0))
+        print('update {:.3f} s, full solve {:.3f} s, cp difference {:.2e}'
+              .format(update_time, time() - start,
+                      np.abs(spm.surface_cp - full.surface_cp).max()))
+
+
+def field_operator_test():
+    """
+    This test calculates flow fields of the airfoil
+    for many alphas by one field operator.
+    """
+    airfoil = figure.NacaAirfoil('2412', 100)
+    grid = figure.Grid(0.5, 0.0, 2.0, 1.0, 150)
+    spm = SourcePanelMethod(airfoil, 1.0)
+    start = time()
+    operator = spm.field_operator(grid)
+    print('Operator: {:.3f} s'.format(time() - start))
+
+    alphas = np.radians(np.linspace(-10.0, 10.0, 21))
+    start = time()
+    lambdas, _, _ = spm.solve_alphas(alphas)
+    vx, vy = operator.velocity(lambdas, alphas, 1.0)
+    print('{} fields: {:.3f} s'.format(len(alphas), time() - start))
+
+    solution = spm.with_alpha(alphas[-1])
+    solution.set_grid(grid, operator=operator)
+    plt = Plot(grid)
+    plt.plot_contour(solution)
+    plt.plot_figure(airfoil)
+    plt.show()
+
+
+def far_field_spm_test():
+    """
+    This test compares exact and multipole velocities
+    on the big grid around the airfoil.
+    """
+    airfoil = figure.NacaAirfoil('2412', 200)
+    spm = SourcePanelMethod(airfoil, 1.0, np.radians(4.0))
+    grid = figure.Grid(0.5, 0.0, 40.0, 40.0, 300)
+    start = time()
+    vx, vy = spm.velocity(grid.xx, grid.yy)
+    print('Exact: {:.3f} s'.format(time() - start))
+    for tolerance in (1e-4, 1e-8, 1e-12):
+        spm.far_field_tolerance = tolerance
+        start = time()
+        fx, fy = spm.velocity(grid.xx, grid.yy)
+        error = max(np.abs(fx - vx).max(), np.abs(fy - vy).max())
+        print('Tolerance {:.0e}: {:.3f} s, error {:.2e}'
+              .format(tolerance, time() - start, error))
+        assert error <= tolerance
+
+
+def alpha_sweep_animation_test():
+    """
+    This test saves animation of the flow over the airfoil
+    for the sweep of alpha, every frame is an image in the directory.
+    """
+    airfoil = figure.NacaAirfoil('2412', 100)
+    grid = figure.Grid(0.5, 0.0, 2.0, 1.2, 120)
+    spm = SourcePanelMethod(airfoil, 1.0)
+    operator = spm.field_operator(grid)
+
+    def compute(alpha: float) -> SourcePanelMethod:
+        solution = spm.with_alpha(np.radians(alpha))
+        solution.set_grid(grid, operator=operator)
+        return solution
+
+    alphas = np.linspace(-10.0, 10.0, 41)
+    animation = FlowAnimation(grid, [airfoil], ('raster', 'quiver'),
+                              quiver_step=6)
+    start = time()
+    animation.save(compute, alphas, 'alpha_sweep',
+                   titles=['alpha = {:.1f}'.format(a) for a in alphas])
+    animation.close()
+    print('{} frames: {:.3f} s'.format(len(alphas), time() - start))
+
+
+def airfoil_thumbnails_test():
+    """
+    This test saves cp thumbnails of the first airfoils
+    from the database, no matplotlib figures are created.
+    """
+    path = r'C:\Users\User\Documents\python\aero\airfoils_data'
+    thumbnails = 'airfoils_thumbnails'
+    makedirs(thumbnails, exist_ok=True)
+    grid = figure.Grid(0.5, 0.0, 1.6, 0.8, 400)
+    start = time()
+    for name in sorted(listdir(path))[:20]:
+        try:
+            airfoil = figure.Airfoil(name, path)
+            spm = SourcePanelMethod(airfoil, 1.0, np.radians(4.0))
+        except AssertionError:
+            continue
+        spm.far_field_tolerance = 1e-6
+        spm.set_grid(grid)
+        Plot.save_raster('{}/{}.png'.format(thumbnails, name), grid, spm,
+                         'cp', airfoil, (-3.0, 1.0), downsample=2)
+    print('20 thumbnails: {:.3f} s'.format(time() - start))
+
+
+def field_cache_test():
+    """
+    This test shows how the same flow on the same grid
+    is taken from the field cache.
+    """
+    flow.Flow.field_cache = flow.FieldCache(path='fields_cache')
+    grid = figure.Grid(0, 0, 20, 20, 1000)
+    for i in range(3):
+        start = time()
+        cylinder = flow.LiftingCylinderFlow(2, 5, 15)
+        cylinder.set_grid(grid)
+        print('set_grid {}: {:.4f} s'.format(i, time() - start))
+    print(flow.Flow.field_cache.stats())
+
+
+def import_time_test():
+    """
+    This test measures how long the numeric core is imported
+    by a new interpreter (worker cold start) and checks that
+    plotting and scraping modules are not imported with it.
+    """
+    heavy = ('matplotlib', 'bs4', 'urllib.request', 'scipy')
+    code = ('import sys\n'
+            'from time import perf_counter\n'
+            'start = perf_counter()\n'
+            'import figure, flow, source_panel_method, circulation\n'
+            'print(perf_counter() - start)\n'
+            'print(*[m for m in {} if m in sys.modules])'.format(heavy))
+    for i in range(3):
+        output = subprocess.run([sys.executable, '-c', code],
+                                capture_output=True, text=True,
+                                check=True).stdout.split('\n')
+        print('core import {}: {:.4f} s'.format(i, float(output[0])))
+        assert not output[1], 'heavy modules: {}'.format(output[1])
+
+
+def batch_panel_method_test():
+    """
+    This test solves a family of ellipses by the batched
+    panel method and compares it with one by one solutions.
+    """
+    a, b = np.meshgrid(np.linspace(1.0, 3.0, 50),
+                       np.linspace(0.2, 1.0, 20))
+    ellipses = figure.Ellipse.batch_ellipses(a, b, num_points=40)
+    alphas = np.linspace(0.0, 0.2, len(ellipses))
+
+    start = time()
+    batch = BatchPanelMethod.from_figures(ellipses, 1.0, alphas)
+    print('Batch of {}: {:.3f} s'.format(len(batch), time() - start))
+
+    start = time()
+    methods = [SourcePanelMethod(e, 1.0, alpha)
+               for e, alpha in zip(ellipses, alphas)]
+    print('One by one: {:.3f} s'.format(time() - start))
+    print('Maximum cp difference: {:.2e}'.format(
+        max(np.abs(m.surface_cp - batch.surface_cp[i]).max()
+            for i, m in enumerate(methods))))
+
+
+def joukowski_reference_test():
+    """
+    This test calculates exact flow over the Joukowski airfoil
+    and compares the panel method with it. Source panels
+    don't have circulation, so the airfoil is symmetric
+    and alpha equals 0.
+    """
+    airfoil = figure.JoukowskiAirfoil(-0.1, 0.1, num_points=200)
+    joukowski = flow.JoukowskiFlow(airfoil, 1.0, 0.1)
+    print('Gamma: {:.4f}, cl: {:.4f}'.format(joukowski.gamma, joukowski.cl))
+    grid = figure.Grid(0.0, 0.0, 6.0, 4.0, 1000)
+    start = time()
+    joukowski.set_grid(grid)
+    print('Exact field {}: {:.3f} s'.format(grid.xx.shape, time() - start))
+
+    symmetric = figure.JoukowskiAirfoil(-0.1, 0.0, num_points=400)
+    exact = flow.JoukowskiFlow(symmetric, 1.0).surface_cp()
+    spm = SourcePanelMethod(symmetric, 1.0)
+    # exact cp at the middle of every panel
+    error = np.abs(spm.surface_cp - 0.5 * (exact[:-1] + exact[1:]))
+    print('Maximum cp error out of the trailing edge: {:.2e}'
+          .format(error[20:-20].max()))
+
+
+def symmetric_spm_test():
+    """
+    This test solves symmetric figures by half systems
+    and compares time and pressure with the full solve.
+    """
+    for body in (figure.Ellipse(2.0, 0.5, num_points=2000),
+                 figure.NacaAirfoil('0012', 1000)):
+        for alpha in (0.0, 0.1):
+            start = time()
+            full = SourcePanelMethod(body, 1.0, alpha, solver='dense')
+            full_time = time() - start
+            start = time()
+            half = SourcePanelMethod(body, 1.0, alpha, symmetric=True)
+            print('{} alpha {}: full {:.3f} s, symmetric {:.3f} s, '
+                  'cp difference {:.1e}'
+                  .format(body.name, alpha, full_time, time() - start,
+                          np.abs(full.surface_cp - half.surface_cp).max()))
+
+
+def process_grid_test():
+    """
+    This test calculates the big grid by threads and by
+    processes, which work with shared memory arrays.
+    """
+    spm = SourcePanelMethod(figure.NacaAirfoil('2412', 200), 1.0, 0.1)
+    grid = figure.Grid(0.0, 0.0, 4.0, 2.0, 800)
+    start = time()
+    vx, vy = spm.velocity(grid.xx, grid.yy, workers=0)
+    print('Threads: {:.3f} s'.format(time() - start))
+    start = time()
+    px, py = spm.process_velocity(grid.xx, grid.yy)
+    print('Processes: {:.3f} s, difference {:.1e}'.format(
+        time() - start, max(np.abs(px - vx).max(), np.abs(py - vy).max())))
+
+
+def higher_order_convergence_test():
+    """
+    This test compares cp error and time of constant panels
+    and higher order panels on the ellipse and on the circle.
+    Surface speed of the ellipse is
+    v (a + b) |sin t| / sqrt(a^2 sin^2 t + b^2 cos^2 t),
+    cp of the circle is 1 - 4 sin^2(t - alpha) as in SPMCircle,
+    which is exact at control points of regular polygons.
+    """
+    a, b = 1.0, 0.25
+    for panels in (32, 64, 128, 256, 512):
+        ellipse = figure.Ellipse(a, b, num_points=panels)
+        results = list()
+        for method in (SourcePanelMethod, HigherOrderPanelMethod):
+            start = time()
+            spm = method(ellipse, 1.0)
+            g = spm.geometry
+            t = np.arctan2(g.yc / b, g.xc / a)
+            speed = (a + b) * np.abs(np.sin(t)) / np.sqrt(
+                (a * np.sin(t)) ** 2 + (b * np.cos(t)) ** 2)
+            results += [np.abs(spm.surface_cp - 1.0 + speed ** 2).max(),
+                        time() - start]
+        print('Ellipse, {} panels: constant {:.1e} ({:.3f} s), '
+              'higher order {:.1e} ({:.3f} s)'.format(panels, *results))
+    alpha = 0.1
+    for panels in (32, 64, 128):
+        circle = figure.Circle(1.0, num_points=panels)
+        errors = list()
+        for spm in (SPMCircle(circle, 1.0, alpha),
+                    HigherOrderPanelMethod(circle, 1.0, alpha)):
+            t = np.arctan2(spm.geometry.yc, spm.geometry.xc)
+            errors.append(np.abs(spm.surface_cp - 1.0 +
+                                 4.0 * np.sin(t - alpha) ** 2).max())
+        print('Circle, {} panels: SPMCircle {:.1e}, '
+              'higher order {:.1e}'.format(panels, *errors))
+
+
+def circulant_spm_test():
+    """
+    This test solves the circle by the dense solver and by FFT,
+    then FFT solves circles with a lot of panels,
+    cp of the circle is 1 - 4 sin^2(t - alpha).
+    """
+    alpha = 0.1
+    circle = figure.Circle(1.0, num_points=2000)
+    start = time()
+    dense = SourcePanelMethod(circle, 1.0, alpha)
+    print('Dense: {:.3f} s'.format(time() - start))
+    start = time()
+    spm = SPMCircle(circle, 1.0, alpha)
+    print('FFT: {:.3f} s, difference {:.1e}'.format(
+        time() - start, np.abs(spm.surface_cp - dense.surface_cp).max()))
+    for panels in (10 ** 4, 10 ** 5, 10 ** 6):
+        start = time()
+        spm = SPMCircle(figure.Circle(1.0, num_points=panels), 1.0, alpha)
+        exact = 1.0 - 4.0 * np.sin(spm.geometry.angle_cp - alpha) ** 2
+        print('{} panels: {:.3f} s, cp error {:.1e}'.format(
+            panels, time() - start, np.abs(spm.surface_cp - exact).max()))
+
+
 # circulation_flow_figure_test()
 # download_all_naca_airfoil_data_test()
 # plot_airfoil_data_test()
@@ -232,3 +823,28 @@ def grid_source_panel_method_test():
 # circle_pressure_coef_spm_test()
 # airfoil_pressure_coef_spm_test()
 # grid_source_panel_method_test()
+# low_memory_spm_test()
+# iterative_spm_test()
+# multi_body_spm_test()
+# figure_batch_test()
+# scene_mask_test()
+# airfoil_index_test()
+# naca_airfoil_test()
+# wake_benchmark_test()
+# threaded_grid_test()
+# save_load_spm_test()
+# panel_service_test()
+# adjoint_sensitivity_test()
+# low_rank_update_test()
+# field_operator_test()
+# far_field_spm_test()
+# alpha_sweep_animation_test()
+# airfoil_thumbnails_test()
+# field_cache_test()
+# import_time_test()
+# batch_panel_method_test()
+# joukowski_reference_test()
+# symmetric_spm_test()
+# process_grid_test()
+# higher_order_convergence_test()
+# circulant_spm_test()
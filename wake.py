@@ -0,0 +1,225 @@
+import numpy as np
+from os import makedirs
+from os.path import join
+from flow import Flow
+
+
+class VortexTree:
+    """
+    Quadtree over point vortices, which calculates induced
+    velocities by multipole expansions of far cells
+    and by direct sums for near ones (tree-code).
+    x, y, gamma - vortex coordinates and circulations;
+    core - blob radius of the direct sums;
+    order - number of multipole terms;
+    theta - cell is far if its size divided by the distance
+    to the target is less than theta;
+    leaf_size - maximum amount of vortices in one leaf.
+    """
+    def __init__(self, x: np.array, y: np.array, gamma: np.array,
+                 core: float, order: int = 12, theta: float = 0.5,
+                 leaf_size: int = 64):
+        self.z = x + 1j * y
+        self.gamma = gamma
+        self.core2 = core ** 2
+        self.order = order
+        self.theta = theta
+        self.leaf_size = leaf_size
+        # center, radius, vortex indexes, children and moments of nodes
+        self.centers, self.radii, self.indexes = list(), list(), list()
+        self.children, self.moments = list(), list()
+        if len(self.z):
+            self.build(np.arange(len(self.z)))
+
+    def build(self, index: np.array) -> int:
+        node = len(self.centers)
+        z = self.z[index]
+        low = complex(z.real.min(), z.imag.min())
+        high = complex(z.real.max(), z.imag.max())
+        center = 0.5 * (low + high)
+        self.centers.append(center)
+        self.radii.append(np.abs(z - center).max())
+        self.indexes.append(index)
+        self.children.append(list())
+        powers = np.cumprod(np.column_stack(
+            [np.ones(len(z))] + [z - center] * (self.order - 1)), axis=1)
+        self.moments.append(self.gamma[index] @ powers)
+        if len(index) <= self.leaf_size or high == low:
+            return node
+        right = z.real >= center.real
+        upper = z.imag >= center.imag
+        for quarter in (right & upper, right & ~upper,
+                        ~right & upper, ~right & ~upper):
+            if quarter.any():
+                self.children[node].append(self.build(index[quarter]))
+        return node
+
+    def velocity(self, x: np.array, y: np.array) -> tuple:
+        """
+        Returns velocities induced at the given points.
+        """
+        target = np.asarray(x, dtype=float) + 1j * np.asarray(y, dtype=float)
+        w = np.zeros(target.shape, dtype=complex)
+        stack = [(0, np.arange(target.size))] if self.centers else []
+        flat_target, flat_w = target.ravel(), w.reshape(-1)
+        while stack:
+            node, index = stack.pop()
+            dz = flat_target[index] - self.centers[node]
+            far = self.radii[node] < self.theta * np.abs(dz)
+            if far.any():
+                inverse = 1.0 / dz[far]
+                term = inverse.copy()
+                result = np.zeros(far.sum(), dtype=complex)
+                for moment in self.moments[node]:
+                    result += moment * term
+                    term *= inverse
+                flat_w[index[far]] += result
+            index = index[~far]
+            if index.size == 0:
+                continue
+            if not self.children[node]:
+                sources = self.indexes[node]
+                flat_w[index] += direct_velocity(
+                    flat_target[index], self.z[sources],
+                    self.gamma[sources], self.core2)
+                continue
+            stack.extend((child, index) for child in self.children[node])
+        # complex velocity is u - iv = i / (2 pi) * sum
+        w = 1j * w / (2.0 * np.pi)
+        return w.real, -w.imag
+
+
+def direct_velocity(target: np.array, z: np.array, gamma: np.array,
+                    core2: float, chunk: int = 2 ** 22) -> np.array:
+    """
+    Direct sum of regularized vortex influences, returns
+    sum of gamma / (target - z) with the blob radius,
+    which is calculated by chunks of targets.
+    """
+    result = np.empty(target.shape, dtype=complex)
+    step = max(chunk // max(len(z), 1), 1)
+    for start in range(0, len(target), step):
+        dz = target[start:start + step, None] - z
+        r2 = dz.real ** 2 + dz.imag ** 2 + core2
+        r2[r2 == 0.0] = np.inf
+        result[start:start + step] = (gamma * dz.conj() / r2).sum(axis=1)
+    return result
+
+
+class VortexWake:
+    """
+    Time marching simulation of the point vortex wake.
+    Vortices are shed into the flow and moved by
+    the combined velocity of the given flow and
+    all other vortices.
+    flow - background flow, for example LiftingCylinderFlow
+    or SourcePanelMethod, it might be None;
+    core - blob radius, it removes singularity of close vortices;
+    integrator - 'rk2' or 'rk4';
+    tree_threshold - tree-code is used if amount of vortices
+    is bigger than this value, direct O(N^2) sum otherwise;
+    theta, order - accuracy of the tree-code.
+    Vortex sign is the same as in VortexFlow,
+    positive gamma rotates clockwise.
+    """
+    integrators = ('rk2', 'rk4')
+
+    def __init__(self, flow: Flow = None, core: float = 0.05,
+                 integrator: str = 'rk4', tree_threshold: int = 4000,
+                 theta: float = 0.5, order: int = 12):
+        assert integrator in self.integrators and core >= 0.0
+        self.flow = flow
+        self.core = core
+        self.integrator = integrator
+        self.tree_threshold = tree_threshold
+        self.theta = theta
+        self.order = order
+        self.x, self.y, self.gamma = np.empty(0), np.empty(0), np.empty(0)
+        self.time = 0.0
+        self.steps = 0
+
+    def __len__(self):
+        return len(self.gamma)
+
+    def add(self, x: np.array, y: np.array, gamma: np.array) -> None:
+        x, y, gamma = np.broadcast_arrays(*(np.atleast_1d(
+            np.asarray(v, dtype=float)) for v in (x, y, gamma)))
+        self.x = np.concatenate((self.x, x))
+        self.y = np.concatenate((self.y, y))
+        self.gamma = np.concatenate((self.gamma, gamma))
+
+    def induced_velocity(self, x: np.array, y: np.array,
+                         vortex_x: np.array = None,
+                         vortex_y: np.array = None) -> tuple:
+        """
+        Velocity which is induced by vortices at the given points,
+        vortex positions might be replaced by the given ones.
+        """
+        vortex_x = self.x if vortex_x is None else vortex_x
+        vortex_y = self.y if vortex_y is None else vortex_y
+        x, y = np.asarray(x, dtype=float), np.asarray(y, dtype=float)
+        if len(self) > self.tree_threshold:
+            tree = VortexTree(vortex_x, vortex_y, self.gamma, self.core,
+                              self.order, self.theta)
+            return tree.velocity(x, y)
+        w = direct_velocity((x + 1j * y).ravel(), vortex_x + 1j * vortex_y,
+                            self.gamma, self.core ** 2).reshape(x.shape)
+        w = 1j * w / (2.0 * np.pi)
+        return w.real, -w.imag
+
+    def velocity(self, x: np.array, y: np.array) -> tuple:
+        """
+        Velocity of the background flow and vortices at vortex points.
+        """
+        vx, vy = self.induced_velocity(x, y, x, y)
+        if self.flow is not None:
+            fx, fy = self.flow.velocity(x, y)
+            vx, vy = vx + fx, vy + fy
+        return vx, vy
+
+    def step(self, dt: float) -> None:
+        """
+        Moves all vortices by one time step.
+        """
+        x, y = self.x, self.y
+        k1 = self.velocity(x, y)
+        if self.integrator == 'rk2':
+            k2 = self.velocity(x + 0.5 * dt * k1[0], y + 0.5 * dt * k1[1])
+            self.x, self.y = x + dt * k2[0], y + dt * k2[1]
+        else:
+            k2 = self.velocity(x + 0.5 * dt * k1[0], y + 0.5 * dt * k1[1])
+            k3 = self.velocity(x + 0.5 * dt * k2[0], y + 0.5 * dt * k2[1])
+            k4 = self.velocity(x + dt * k3[0], y + dt * k3[1])
+            self.x = x + dt / 6.0 * (k1[0] + 2.0 * k2[0] + 2.0 * k3[0] + k4[0])
+            self.y = y + dt / 6.0 * (k1[1] + 2.0 * k2[1] + 2.0 * k3[1] + k4[1])
+        self.time += dt
+        self.steps += 1
+
+    def run(self, steps: int, dt: float, shed_point: tuple = None,
+            shed_gamma: float = 0.0, snapshot_every: int = 0,
+            path: str = '.') -> None:
+        """
+        Makes given amount of steps. On every step vortex with
+        shed_gamma circulation is added at shed_point.
+        Every snapshot_every steps vortices are saved to the path
+        (current directory by default).
+        """
+        if snapshot_every > 0:
+            makedirs(path, exist_ok=True)
+        for _ in range(steps):
+            if shed_point is not None:
+                self.add(shed_point[0], shed_point[1], shed_gamma)
+            self.step(dt)
+            if snapshot_every > 0 and self.steps % snapshot_every == 0:
+                self.save_snapshot(join(path, 'wake_{:06d}.npz'
+                                        .format(self.steps)))
+
+    def save_snapshot(self, file: str) -> None:
+        np.savez(file, x=self.x, y=self.y, gamma=self.gamma,
+                 time=self.time, steps=self.steps)
+
+    def load_snapshot(self, file: str) -> None:
+        with np.load(file) as data:
+            self.x, self.y = data['x'], data['y']
+            self.gamma = data['gamma']
+            self.time, self.steps = float(data['time']), int(data['steps'])